@@ -0,0 +1,183 @@
+"""
+    Traces many truck configurations in one run, reading each input file once.
+    run 'python3 batch.py --help' for the options
+"""
+import argparse
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from os import path
+from cli import configJobs
+from csvconfig import CsvConfig
+from export import ExportManager
+from graphmanager import GraphManager
+from inputparser import InputParser
+from messagelog import MessageLog, StreamLog
+from reportcache import ReportCache
+
+# parsed inputs of the batch, handed to each worker process once when it starts
+_inputs = {'pdcs': [], 'reports': []}
+
+
+def shareInputs(pdcs, reports):
+    """
+        pdcs: parsed fuse maps, lists from InputParser.readPDC
+        reports: parsed Report objects
+        pool initializer that keeps the parsed inputs in the worker process,
+        so each configuration only sends the positions of its inputs
+    """
+    _inputs['pdcs'] = pdcs
+    _inputs['reports'] = reports
+
+
+def traceConfiguration(pdc_ids, report_ids, output):
+    """
+        pdc_ids: positions of the configuration's fuse maps in the shared inputs
+        report_ids: positions of the configuration's reports in the shared inputs
+        output: trace file to write, in the format of its extension
+        builds the graph of one configuration from the shared inputs and saves its
+        trace. returns a MessageLog with the messages reported along the way
+    """
+    log = MessageLog()
+    graph = GraphManager(log)
+    for pdc_id in pdc_ids:
+        graph.addPDC(_inputs['pdcs'][pdc_id])
+    for report_id in report_ids:
+        graph.addReport(_inputs['reports'][report_id])
+    export = ExportManager(log)
+    export.setSavePath(output)
+    export.exportTrace(graph.traceRecords(False), graph.unfedRows(), graph.rules)
+    return log
+
+
+def readManifest(filename):
+    """
+        filename: path of the JSON manifest
+        Returns the list of configurations in the manifest. The manifest holds
+        {"configs": configuration file, "configurations": [...]}, where each
+        configuration is {"name", "reports", "pdc", "config", "output"}: the
+        wire report and fuse map paths, the name of the saved column configuration,
+        and the trace file to write. Relative paths are relative to the manifest
+    """
+    with open(filename, 'r') as file:
+        manifest = json.load(file)
+    folder = path.dirname(path.abspath(filename))
+
+    def resolve(name):
+        return path.normpath(path.join(folder, name))
+
+    configs = resolve(manifest.get('configs', 'configs.csv'))
+    configurations = []
+    for entry in manifest['configurations']:
+        configurations.append({'name': entry['name'],
+                               'reports': [resolve(x) for x in entry['reports']],
+                               'pdc': [resolve(x) for x in entry['pdc']],
+                               'config': entry['config'],
+                               'configs': resolve(entry.get('configs', configs)),
+                               'output': resolve(entry['output'])})
+    return configurations
+
+
+def runBatch(configurations, log, cache=None, workers=None):
+    """
+        configurations: list of configurations from readManifest
+        log: object with a reportError method for the batch messages
+        cache: ReportCache for parsed reports, or None
+        workers: number of worker processes, None for one per core
+        Reads every distinct fuse map and every distinct (report, columns) pair
+        once, then traces the configurations in a pool of worker processes,
+        writing one trace file each. Messages are passed to log in the order of
+        configurations. A configuration whose trace fails is reported as an error
+        and the rest are still traced. returns the number of configurations traced
+    """
+    parser = InputParser(log, cache)
+    jobs = {}
+    pdcs = {}
+    plans = []
+    for configuration in configurations:
+        fields = CsvConfig(configuration['configs'], log).search(configuration['config'])
+        if not fields:
+            missing = configuration['name'] + ": no configuration named "
+            log.reportError(missing + configuration['config'], "error")
+            continue
+        try:
+            report_jobs = configJobs(fields, configuration['reports'])
+        except ValueError as error:
+            log.reportError(configuration['name'] + ": " + str(error), "error")
+            continue
+        for job in report_jobs:
+            jobs.setdefault(job, len(jobs))
+        for pdc_path in configuration['pdc']:
+            if pdc_path not in pdcs:
+                pdcs[pdc_path] = len(pdcs)
+        plans.append((configuration['name'],
+                      [pdcs[x] for x in configuration['pdc']],
+                      [jobs[x] for x in report_jobs],
+                      configuration['output']))
+
+    try:
+        parsed_pdcs = [parser.readPDC(x) or [] for x in pdcs]
+        reports = parser.readReports(list(jobs))
+    finally:
+        parser.close()
+    for report in reports:
+        # the worker processes report to their own logs
+        report.gui = None
+        report.cache = None
+    counts = str(len(pdcs)) + " fuse maps and " + str(len(reports)) + " reports"
+    log.reportError("read " + counts + " for " + str(len(plans)) + " configurations", "log")
+
+    # a configuration that fails leaves its exception in place of its messages,
+    # so the others are still traced
+    results = []
+    if len(plans) < 2:
+        shareInputs(parsed_pdcs, reports)
+        for plan in plans:
+            try:
+                results.append(traceConfiguration(*plan[1:]))
+            except Exception as error:
+                results.append(error)
+    else:
+        with ProcessPoolExecutor(workers, initializer=shareInputs,
+                                 initargs=(parsed_pdcs, reports)) as pool:
+            futures = [pool.submit(traceConfiguration, *plan[1:]) for plan in plans]
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as error:
+                    results.append(error)
+    traced = 0
+    for plan, result in zip(plans, results):
+        log.reportError("configuration " + plan[0] + ":", "log")
+        if isinstance(result, Exception):
+            failed = type(result).__name__ + ": " + str(result)
+            log.reportError(plan[0] + ": trace failed: " + failed, "error")
+            continue
+        result.replay(log)
+        traced += 1
+    return traced
+
+
+def main(argv=None):
+    """
+        argv: command line arguments, defaults to sys.argv
+        runs every configuration in the manifest and returns the exit status:
+        0 on success, 1 if any errors were reported
+    """
+    parser = argparse.ArgumentParser(description="trace many configurations in one run")
+    parser.add_argument('manifest', help="JSON manifest of the configurations")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="number of worker processes (default one per core)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="don't reuse or store parsed reports")
+    parser.add_argument('--quiet', action='store_true',
+                        help="only print warnings and errors")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    log = StreamLog(sys.stderr, args.quiet)
+    runBatch(readManifest(args.manifest), log,
+             None if args.no_cache else ReportCache(), args.workers)
+    return 1 if log.counts.get("error") else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,341 @@
+"""
+    Benchmarks for the wire validation tool.
+    run 'python3 benchmark.py trace' from /src/pyside2 to time
+    GraphManager.traceWires on synthetic harnesses of growing size,
+    or 'python3 benchmark.py ground' to time it on harnesses whose circuits all
+    return to one shared ground, so every PDC traces the whole harness,
+    or 'python3 benchmark.py backend' to compare the memory and speed
+    of the networkx and compact graph backends,
+    or 'python3 benchmark.py xlsx' to compare the streaming xlsx reader with openpyxl,
+    or 'python3 benchmark.py export' to compare the streaming trace export with an
+    in-memory workbook, up to 1M rows,
+    or 'python3 benchmark.py check' to trace small harnesses with known rows on
+    both backends
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from openpyxl import Workbook, load_workbook
+from export import ExportManager
+from graphmanager import GraphManager
+from wiretable import WireTable
+from xlsxreader import XlsxReader
+try:
+    import resource
+except ImportError:
+    # windows has no resource module, the export benchmark then skips memory
+    resource = None
+
+
+class QuietGui:
+    """
+        QuietGui: stands in for the App window so the benchmarks
+        don't flood the terminal with status messages
+    """
+
+    def reportError(self, error_code, error_type):
+        """
+            discards the message
+        """
+
+
+class SyntheticReport:
+    """
+        SyntheticReport: a generated wire report shaped like a real cab harness
+        Each PDC pin feeds a run of inline connectors into a splice,
+        which fans out to several end components. With shared_ground one more
+        branch of each splice returns through a ground stud to a ground splice
+        shared by every circuit, so all the PDC pins are in one component
+        Fields:
+            filename: name shown in log messages
+            filepath: identifies the report to GraphManager, the same as filename
+            table: WireTable of the wires, as returned by Report.getContents()
+            pdc_list: fuse map rows for the PDC pins, as returned by InputParser.readPDC()
+    """
+
+    def __init__(self, wire_count, fanout=4, inline=3, shared_ground=False):
+        self.filename = "synthetic_" + str(wire_count) + ".xlsx"
+        self.filepath = self.filename
+        self.table = WireTable()
+        self.pdc_list = []
+        circuit = 0
+        while len(self.table) < wire_count:
+            pdc = ("PDC" + str(circuit // 50), str(circuit % 50))
+            self.pdc_list.append({'CONNECTOR': pdc, 'FUSE': '15'})
+            prev = pdc
+            for hop in range(inline):
+                conn = ("C" + str(circuit) + "_" + str(hop), "1")
+                self.addWire(prev, conn, 2.5)
+                prev = conn
+            splice = ("S" + str(circuit), "1")
+            self.addWire(prev, splice, 1.5)
+            for branch in range(fanout):
+                self.addWire(splice, ("E" + str(circuit) + "_" + str(branch), "1"), 0.75)
+            if shared_ground:
+                stud = ("G" + str(circuit), "1")
+                self.addWire(splice, stud, 1.5)
+                self.addWire(stud, ("SGND", "1"), 2.5)
+            circuit += 1
+
+    def addWire(self, from_tup, to_tup, csa):
+        """
+            appends a wire row between two (component, pin) tuples
+        """
+        name = "W" + str(len(self.table))
+        self.table.append(from_tup[0], from_tup[1], to_tup[0], to_tup[1], csa, name)
+
+    def getContents(self):
+        """
+            getter for table
+        """
+        return self.table
+
+
+def benchTrace(sizes, shared_ground=False):
+    """
+        sizes: wire counts to generate harnesses for
+        shared_ground: return every circuit to one ground, see SyntheticReport
+        times traceWires for each harness size and prints the time per row.
+        Each PDC gets a row for every end it reaches, so the cost grows with the
+        number of rows, not of wires. The time per row should stay flat as the
+        harness grows, while with a shared ground the rows, and the time, grow
+        with the square of the wires
+    """
+    print("wires".rjust(10), "rows".rjust(10), "seconds".rjust(10), "us/row".rjust(10))
+    for size in sizes:
+        report = SyntheticReport(size, shared_ground=shared_ground)
+        graph = buildGraph(report, 'networkx')
+        start = time.perf_counter()
+        rows = sum(1 for _ in graph.traceWires())
+        elapsed = time.perf_counter() - start
+        wires = len(report.getContents())
+        print(str(wires).rjust(10), str(rows).rjust(10), format(elapsed, ".3f").rjust(10),
+              format(elapsed / max(rows, 1) * 1e6, ".2f").rjust(10))
+
+
+def buildGraph(report, backend):
+    """
+        report: SyntheticReport to load
+        backend: GraphManager backend name
+        returns a GraphManager holding the report
+    """
+    graph = GraphManager(QuietGui(), backend)
+    graph.addPDC(report.pdc_list)
+    graph.addReport(report)
+    return graph
+
+
+def benchBackend(sizes):
+    """
+        sizes: wire counts to generate harnesses for
+        compares graph memory, build time, and trace time of the
+        networkx and compact backends for each harness size
+    """
+    print("wires".rjust(10), "backend".rjust(10), "MB".rjust(10),
+          "build s".rjust(10), "trace s".rjust(10))
+    for size in sizes:
+        report = SyntheticReport(size)
+        for backend in ('networkx', 'compact'):
+            tracemalloc.start()
+            graph = buildGraph(report, backend)
+            # counts the trace view and cached trace rows too,
+            # which the networkx backend has to build on top of its graph
+            list(graph.traceWires())
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del graph
+
+            start = time.perf_counter()
+            graph = buildGraph(report, backend)
+            built = time.perf_counter()
+            list(graph.traceWires())
+            traced = time.perf_counter()
+            print(str(len(report.getContents())).rjust(10), backend.rjust(10),
+                  format(memory / 2 ** 20, ".1f").rjust(10),
+                  format(built - start, ".3f").rjust(10), format(traced - built, ".3f").rjust(10))
+
+
+# (name, fuse map pins, wires as (from, to, name), expected traceWires rows) of
+# small harnesses whose rows are known from the plain breadth-first trace
+CHECK_CASES = [
+    # a splice feeding two loads that are also wired to each other. The loop is
+    # headed at the splice, so it isn't reported, and its wires stay in the rows
+    ("splice-headed loop", [("PDC", "1")],
+     [(("PDC", "1"), ("S1", "1"), "W1"), (("S1", "1"), ("A", "1"), "W2"),
+      (("S1", "1"), ("B", "1"), "W3"), (("A", "1"), ("B", "1"), "W4")],
+     [("PDC|1", "A|1", 1.0, "W1, W2", "S1"), ("PDC|1", "B|1", 1.0, "W1, W3", "S1")]),
+]
+
+
+def checkTraces():
+    """
+        traces each harness of CHECK_CASES on both backends and prints whether
+        its rows match the expected rows. returns True if they all match
+    """
+    passed = True
+    for name, pins, wires, expected in CHECK_CASES:
+        table = WireTable()
+        for from_tup, to_tup, wire in wires:
+            table.append(from_tup[0], from_tup[1], to_tup[0], to_tup[1], 1.0, wire)
+        report = SyntheticReport(0)
+        report.table = table
+        report.pdc_list = [{'CONNECTOR': x, 'FUSE': '15'} for x in pins]
+        for backend in ('networkx', 'compact'):
+            rows = list(buildGraph(report, backend).traceWires())
+            if rows == expected:
+                print("ok".rjust(10), backend.rjust(10), name)
+            else:
+                passed = False
+                print("FAILED".rjust(10), backend.rjust(10), name, rows)
+    return passed
+
+
+def writeReport(report, filepath):
+    """
+        report: SyntheticReport to save
+        filepath: path of the xlsx file to write
+        saves the report as a wire report workbook with a few unmapped columns
+    """
+    workb = Workbook(write_only=True)
+    works = workb.create_sheet()
+    works.append(["Wire", "Color", "From Component", "From Pin", "To Component", "To Pin",
+                  "CSA", "Length"])
+    table = report.getContents()
+    strings = table.strings
+    for i, wire in enumerate(table.wire):
+        works.append([wire, "BK", strings[table.from_conn[i]], strings[table.from_pin[i]],
+                      strings[table.to_conn[i]], strings[table.to_pin[i]], table.csa[i], 1200])
+    workb.save(filepath)
+
+
+def benchXlsx(sizes):
+    """
+        sizes: wire counts to generate reports for
+        times reading the six mapped columns of a wire report with
+        XlsxReader and with openpyxl in read-only mode
+    """
+    columns = (2, 3, 4, 5, 6, 0)
+    print("rows".rjust(10), "openpyxl s".rjust(12), "xlsxreader s".rjust(12), "speedup".rjust(10))
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            filepath = os.path.join(folder, "report_" + str(size) + ".xlsx")
+            writeReport(SyntheticReport(size), filepath)
+
+            start = time.perf_counter()
+            workb = load_workbook(filepath, read_only=True)
+            sheet = workb.active
+            slow = [tuple(row[x] for x in columns)
+                    for row in sheet.iter_rows(2, sheet.max_row, values_only=True)]
+            workb.close()
+            middle = time.perf_counter()
+            with XlsxReader(filepath) as reader:
+                fast = list(reader.rows(columns, min_row=2))
+            end = time.perf_counter()
+
+            if fast != slow:
+                print("readers disagree on", filepath)
+            print(str(len(fast)).rjust(10), format(middle - start, ".3f").rjust(12),
+                  format(end - middle, ".3f").rjust(12),
+                  format((middle - start) / (end - middle), ".1f").rjust(10))
+
+
+def traceRows(count):
+    """
+        count: number of rows to generate
+        yields trace rows shaped like traceWires output, through a splice
+        to one of several end components
+    """
+    for i in range(count):
+        circuit = str(i // 4)
+        wires = ", ".join("W" + circuit + "_" + str(hop) for hop in range(5))
+        end = "E" + circuit + "_" + str(i % 4) + "|1"
+        yield ("PDC" + str(i // 200) + "|" + str(i // 4 % 50), end, 0.75, wires, "S" + circuit)
+
+
+def saveOpenpyxl(rows, filepath, write_only):
+    """
+        rows: trace rows to save
+        filepath: path of the xlsx file to write
+        write_only: use an openpyxl write-only workbook, otherwise an ordinary one
+            holding every cell of the sheet in memory until it is saved, the way
+            exportToExcel did before it streamed
+    """
+    workb = Workbook(write_only=write_only)
+    works = workb.create_sheet() if write_only else workb.active
+    works.append(["Starting Component | PIN", "Ending Component | PIN", "Minimum CSA",
+                  "Wires", "Splice(s)"])
+    for row in rows:
+        works.append(row)
+    workb.save(filepath)
+
+
+def exportRows(writer, size, filepath):
+    """
+        writer: "in-memory" or "write-only" for openpyxl, or "streamed" for exportToExcel
+        size: number of trace rows to save
+        filepath: path of the xlsx file to write
+        saves the rows with the writer in a fresh worker process and returns the
+        seconds taken and the peak memory of the process in MB, or None where
+        the platform can't tell
+    """
+    start = time.perf_counter()
+    if writer == "streamed":
+        export = ExportManager(QuietGui())
+        export.setSavePath(filepath)
+        export.exportToExcel(traceRows(size))
+    else:
+        saveOpenpyxl(traceRows(size), filepath, writer == "write-only")
+    elapsed = time.perf_counter() - start
+    if resource is None:
+        return elapsed, None
+    # ru_maxrss is in kilobytes on linux
+    return elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+
+
+def benchExport(sizes):
+    """
+        sizes: trace row counts to save
+        compares the time and peak memory of ExportManager.exportToExcel with
+        ordinary and write-only openpyxl workbooks for each row count. Each save
+        runs in its own process, so one writer's memory doesn't count against another
+    """
+    print("rows".rjust(10), "writer".rjust(10), "seconds".rjust(10), "peak MB".rjust(10))
+    print("(peak MB is of the whole process, including the interpreter)")
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            for writer in ("in-memory", "write-only", "streamed"):
+                filepath = os.path.join(folder, writer + ".xlsx")
+                with ProcessPoolExecutor(1) as pool:
+                    elapsed, peak = pool.submit(exportRows, writer, size, filepath).result()
+                print(str(size).rjust(10), writer.rjust(10), format(elapsed, ".2f").rjust(10),
+                      "-".rjust(10) if peak is None else format(peak, ".1f").rjust(10))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="wire validation tool benchmarks")
+    parser.add_argument('bench', choices=['trace', 'ground', 'backend', 'xlsx', 'export', 'check'])
+    parser.add_argument('--sizes', type=int, nargs='+')
+    args = parser.parse_args()
+    if args.sizes is None:
+        if args.bench == 'export':
+            args.sizes = [10000, 100000, 1000000]
+        elif args.bench == 'ground':
+            args.sizes = [500, 1000, 2000, 4000]
+        else:
+            args.sizes = [2000, 8000, 32000, 128000]
+    if args.bench == 'trace':
+        benchTrace(args.sizes)
+    elif args.bench == 'ground':
+        benchTrace(args.sizes, shared_ground=True)
+    elif args.bench == 'backend':
+        benchBackend(args.sizes)
+    elif args.bench == 'xlsx':
+        benchXlsx(args.sizes)
+    elif args.bench == 'export':
+        benchExport(args.sizes)
+    elif args.bench == 'check':
+        sys.exit(0 if checkTraces() else 1)
@@ -0,0 +1,140 @@
+import math
+from array import array
+
+
+class ChainGraph:
+    """
+        ChainGraph: a frozen CompactGraph with its inline pass-throughs contracted
+        A node with exactly two wires that isn't a pdc or a splice only passes the
+        circuit on, so each run of such nodes between two other nodes, the
+        junctions, is joined into one chain. Traces step from junction to junction
+        along chains instead of through every inline connector.
+        Chains between the same two junctions, and chains from a junction back to
+        itself, are kept apart, so the chain adjacency can hold repeated entries.
+        Fields:
+            graph: frozen CompactGraph the chains were built from
+            indptr: start of each node's entries in indices and edge_ids, like
+                CompactGraph. Inner nodes of chains have no entries
+            indices: junction node id at the far end of each adjacency entry
+            edge_ids: chain id of each adjacency entry
+            chain_u, chain_v: junction node ids at either end of each chain
+            wire_start: start of each chain's wires in wires, with a final entry
+                for the end of the last chain
+            wires: wire ids of the chains, in order from chain_u to chain_v
+            wire_names: wire name of each entry in wires, as a string
+            wire_csa: CSA of each entry in wires
+            inner: inner node ids of the chains, in order from chain_u to chain_v.
+                chain c holds inner[wire_start[c] - c:wire_start[c + 1] - c - 1]
+            csa: minimum CSA of the wires of each chain, leaving out CSAs that
+                aren't numbers
+            chain_of: chain id of each inner node, -1 for junctions
+        Methods:
+            length(chain): number of wires on the chain
+            wireNames(chain, reverse): wire names of the chain
+            chainInner(chain): inner node ids of the chain, in order from chain_u
+    """
+
+    def __init__(self, graph):
+        """
+            graph: frozen CompactGraph to contract
+        """
+        self.graph = graph
+        count = len(graph)
+        g_indptr, g_indices, g_edge_ids = graph.indptr, graph.indices, graph.edge_ids
+        g_csa = graph.csa
+        junction = self._junctions(graph)
+        chain_u = self.chain_u = array('i')
+        chain_v = self.chain_v = array('i')
+        wire_start = self.wire_start = array('i', [0])
+        wires = self.wires = array('i')
+        inner = self.inner = array('i')
+        chain_csa = self.csa = array('d')
+        chain_of = self.chain_of = array('i', [-1]) * count
+        indptr = self.indptr = array('i', [0])
+        indices = self.indices = array('i')
+        edge_ids = self.edge_ids = array('i')
+        # chain id of the first and last wire of each chain, to find it again
+        # from the junction at its other end
+        chain_by_wire = array('i', [-1]) * len(graph.wire)
+        for node in range(count):
+            if not junction[node]:
+                indptr.append(len(indices))
+                continue
+            for k in range(g_indptr[node], g_indptr[node + 1]):
+                wire = g_edge_ids[k]
+                chain = chain_by_wire[wire]
+                if chain >= 0:
+                    # walked from its other end, or a chain back round to node
+                    indices.append(chain_u[chain])
+                    edge_ids.append(chain)
+                    continue
+                chain = len(chain_u)
+                chain_by_wire[wire] = chain
+                end = g_indices[k]
+                prev = node
+                # NaN never compares lower, so CSAs that aren't numbers are left out
+                min_csa = g_csa[wire] if g_csa[wire] < math.inf else math.inf
+                wires.append(wire)
+                while not junction[end]:
+                    inner.append(end)
+                    chain_of[end] = chain
+                    # an inner node has two neighbours, go on through the one not come from
+                    step = g_indptr[end]
+                    if g_indices[step] == prev:
+                        step += 1
+                    prev = end
+                    end = g_indices[step]
+                    wire = g_edge_ids[step]
+                    wires.append(wire)
+                    if g_csa[wire] < min_csa:
+                        min_csa = g_csa[wire]
+                chain_by_wire[wire] = chain
+                chain_u.append(node)
+                chain_v.append(end)
+                chain_csa.append(min_csa)
+                wire_start.append(len(wires))
+                indices.append(end)
+                edge_ids.append(chain)
+            indptr.append(len(indices))
+        self.wire_names = [str(graph.wire[x]) for x in wires]
+        self.wire_csa = array('d', [g_csa[x] for x in wires])
+
+    @staticmethod
+    def _junctions(graph):
+        """
+            graph: frozen CompactGraph
+            returns a bytearray holding 1 for each node kept as a junction: a pdc,
+            a splice, a node without exactly two wires, or a node wired to itself
+        """
+        indptr, indices, fuse, names = graph.indptr, graph.indices, graph.fuse, graph.names
+        junction = bytearray(b'\x01') * len(graph)
+        for node in range(len(graph)):
+            start = indptr[node]
+            if indptr[node + 1] - start != 2 or fuse[node] >= 0 or names[node][:1] == 'S':
+                continue
+            if node not in (indices[start], indices[start + 1]):
+                junction[node] = 0
+        return junction
+
+    def length(self, chain):
+        """
+            returns the number of wires on the chain
+        """
+        return self.wire_start[chain + 1] - self.wire_start[chain]
+
+    def wireNames(self, chain, reverse=False):
+        """
+            chain: chain id
+            reverse: list the wires from chain_v back towards chain_u
+            returns the wire names of the chain
+        """
+        names = self.wire_names[self.wire_start[chain]:self.wire_start[chain + 1]]
+        if reverse:
+            names.reverse()
+        return names
+
+    def chainInner(self, chain):
+        """
+            returns the inner node ids of the chain, in order from chain_u to chain_v
+        """
+        return self.inner[self.wire_start[chain] - chain:self.wire_start[chain + 1] - chain - 1]
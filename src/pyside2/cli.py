@@ -0,0 +1,97 @@
+"""
+    Runs the wire validation without the gui, for scripted and overnight runs.
+    run 'python3 cli.py --help' for the options
+"""
+import argparse
+import sys
+from os import path
+from csvconfig import CsvConfig
+from export import FORMATS, ExportManager, availableFormats
+from graphmanager import GraphManager
+from inputparser import InputParser
+from messagelog import StreamLog
+from pipeline import Pipeline
+from reportcache import ReportCache
+
+
+def configJobs(fields, report_paths):
+    """
+        fields: configuration row from CsvConfig.search, the name followed by the
+            column numbers saved by the gui, where 1 is the first column
+        report_paths: full file paths of the wire reports
+        returns the report jobs for InputParser.readReports, reading every
+        report with the configuration's columns
+    """
+    columns = [int(x) - 1 for x in fields[1:7]]
+    if len(columns) != 6:
+        raise ValueError("configuration " + str(fields[0]) + " doesn't have 6 columns")
+    return [(path, (columns[0], columns[1]), (columns[2], columns[3]), columns[4], columns[5])
+            for path in report_paths]
+
+
+def parseArgs(argv):
+    """
+        argv: command line arguments, without the program name
+        returns the parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="trace wire reports without the gui")
+    parser.add_argument('--reports', nargs='+', required=True, metavar='XLSX',
+                        help="wire report files")
+    parser.add_argument('--pdc', nargs='+', required=True, metavar='CSV',
+                        help="PDC fuse map files")
+    parser.add_argument('--config', required=True,
+                        help="name of the saved column configuration")
+    parser.add_argument('--configs', default="configs.csv",
+                        help="configuration file saved by the gui (default configs.csv)")
+    parser.add_argument('--output', required=True,
+                        help="trace file to write, in the format of its extension")
+    parser.add_argument('--format', choices=[x[1:] for x in FORMATS],
+                        help="format of the trace file when --output has no extension "
+                             "(default xlsx)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="don't reuse or store parsed reports")
+    parser.add_argument('--quiet', action='store_true',
+                        help="only print warnings and errors")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+        argv: command line arguments, defaults to sys.argv
+        runs the pipeline and returns the exit status: 0 on success,
+        1 if any errors were reported, 2 if the configuration can't be used
+    """
+    args = parseArgs(sys.argv[1:] if argv is None else argv)
+    log = StreamLog(sys.stderr, args.quiet)
+    fields = CsvConfig(args.configs, log).search(args.config)
+    if not fields:
+        log.reportError("no configuration named " + args.config + " in " + args.configs,
+                        "error")
+        return 2
+    try:
+        jobs = configJobs(fields, args.reports)
+    except ValueError as error:
+        log.reportError(str(error), "error")
+        return 2
+
+    export = ExportManager(log)
+    extension = path.splitext(args.output)[1].lower()
+    if args.format is not None and extension in FORMATS and extension != '.' + args.format:
+        log.reportError("--output " + args.output + " isn't a " + args.format + " file", "error")
+        return 2
+    export.setSavePath(args.output, None if args.format is None else '.' + args.format)
+    extension = path.splitext(export.getSavePath())[1]
+    if extension not in availableFormats():
+        log.reportError("saving " + extension + " files needs the pyarrow package", "error")
+        return 2
+
+    parser = InputParser(log, None if args.no_cache else ReportCache())
+    try:
+        Pipeline(parser, GraphManager(log), export).run(args.pdc, jobs, log)
+    finally:
+        parser.close()
+    return 1 if log.counts.get("error") else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,254 @@
+from array import array
+from wiretable import toFloat
+
+
+class CompactGraph:
+    """
+        CompactGraph: harness graph held in flat arrays instead of networkx dicts
+        Node names are interned to integer ids and every wire is one entry in a set
+        of parallel arrays. freeze() packs the wires into CSR adjacency arrays that
+        GraphManager traces on. Like networkx, adding a second wire between the same
+        two nodes replaces the first one. A removed node keeps its id, which is
+        given back to it if a node of the same name is added again.
+        Fields:
+            names: node name for each node id
+            ids: maps node names to node ids, without the removed nodes
+            fuse: fuse rating for each node id, -1 for nodes not in a fuse map
+            edge_u, edge_v: node ids at either end of each wire id
+            csa: CSA of each wire id, NaN when the report value is not a number
+            wire: wire name of each wire id
+            source: id of the report each wire id came from, -1 when not from a report
+            indptr: start of each node's entries in indices and edge_ids,
+                with a final entry for the end of the last node
+            indices: neighbour node id of each adjacency entry
+            edge_ids: wire id of each adjacency entry
+        Methods:
+            add_node(name, fuse_rating): adds a node, or updates its fuse rating
+            add_edge(u_name, v_name, wire, csa): adds a wire between two named nodes
+            addWires(u_ids, v_ids, csa, wires, source): adds a batch of wires between node ids
+            removeSource(source): removes the wires that came from a report
+            removeNodes(node_ids): removes nodes that no longer have any wires
+            freeze(): builds the CSR adjacency arrays after nodes or wires are added
+            fromNetworkx(graph): builds a frozen CompactGraph from a networkx graph
+    """
+
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+        self.fuse = array('i')
+        self.edge_u = array('i')
+        self.edge_v = array('i')
+        self.csa = array('d')
+        self.wire = []
+        self.source = array('i')
+        self.indptr = array('i', [0])
+        self.indices = array('i')
+        self.edge_ids = array('i')
+        self._retired = {}
+        self._frozen = True
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def clear(self):
+        """
+            removes all nodes and wires
+        """
+        self.__init__()
+
+    def add_node(self, name, connector=None, pin=None, fuse_rating=None):
+        """
+            name: node name, 'component|pin' or the splice name
+            connector, pin: accepted for parity with networkx, the name already holds them
+            fuse_rating: fuse rating to set, left unchanged for an existing node when None
+            adds the node if it doesn't exist and returns its id
+        """
+        del connector, pin
+        node = self.ids.get(name)
+        if node is None and name in self._retired:
+            node = self._retired.pop(name)
+            self.ids[name] = node
+            self.fuse[node] = -1 if fuse_rating is None else fuse_rating
+        elif node is None:
+            node = len(self.names)
+            self.ids[name] = node
+            self.names.append(name)
+            self.fuse.append(-1 if fuse_rating is None else fuse_rating)
+            self._frozen = False
+        elif fuse_rating is not None:
+            self.fuse[node] = fuse_rating
+        return node
+
+    def add_edge(self, u_name, v_name, wire=None, csa=None):
+        """
+            u_name, v_name: names of the nodes at either end, added if missing
+            wire: wire name
+            csa: wire CSA
+            adds a wire between the two nodes and returns its id
+        """
+        return self._addWire(self.add_node(u_name), self.add_node(v_name), wire, csa)
+
+    def addWires(self, u_ids, v_ids, csa, wires, source=-1):
+        """
+            u_ids, v_ids: node ids at either end of each wire
+            csa: float CSA of each wire
+            wires: wire name of each wire
+            source: id of the report the wires came from
+            adds a batch of wires between existing nodes
+        """
+        self.edge_u.extend(u_ids)
+        self.edge_v.extend(v_ids)
+        self.csa.extend(csa)
+        self.wire.extend(wires)
+        self.source.extend(array('i', [source]) * len(wires))
+        self._frozen = False
+
+    def removeSource(self, source):
+        """
+            source: id of a report passed to addWires
+            Removes the wires that came from the report. Their ids stay taken, so
+            the ids of other wires don't change. A wire between the same two nodes
+            from another report takes the place of a removed one.
+            returns the set of node ids at the ends of the removed wires
+        """
+        touched = set()
+        for edge, edge_source in enumerate(self.source):
+            if edge_source == source and self.edge_u[edge] >= 0:
+                touched.add(self.edge_u[edge])
+                touched.add(self.edge_v[edge])
+                self.edge_u[edge] = -1
+                self.edge_v[edge] = -1
+                self.source[edge] = -1
+        if touched:
+            self._frozen = False
+        return touched
+
+    def removeNodes(self, node_ids):
+        """
+            node_ids: ids of nodes with no wires left
+            Removes the nodes from ids, so they are no longer part of the graph.
+            Their ids stay taken and are reused if the same names are added again
+        """
+        for node in node_ids:
+            name = self.names[node]
+            if self.ids.get(name) == node:
+                del self.ids[name]
+                self._retired[name] = node
+                self.fuse[node] = -1
+
+    def _addWire(self, u, v, wire, csa):
+        self.edge_u.append(u)
+        self.edge_v.append(v)
+        self.csa.append(toFloat(csa))
+        self.wire.append(wire)
+        self.source.append(-1)
+        self._frozen = False
+        return len(self.wire) - 1
+
+    def freeze(self):
+        """
+            Builds the CSR adjacency arrays from the wire arrays.
+            Each node lists its wires in the order they were added, and a later
+            wire between the same two nodes takes the place of the earlier one.
+            Removed wires are skipped
+        """
+        if self._frozen:
+            return
+        count = len(self.names)
+        indptr = array('i', [0]) * (count + 1)
+        for u, v in zip(self.edge_u, self.edge_v):
+            if u < 0:
+                continue
+            indptr[u + 1] += 1
+            if u != v:
+                indptr[v + 1] += 1
+        for node in range(count):
+            indptr[node + 1] += indptr[node]
+        fill = array('i', indptr)
+        indices = array('i', [0]) * indptr[count]
+        edge_ids = array('i', [0]) * indptr[count]
+        for edge, (u, v) in enumerate(zip(self.edge_u, self.edge_v)):
+            if u < 0:
+                continue
+            indices[fill[u]] = v
+            edge_ids[fill[u]] = edge
+            fill[u] += 1
+            if u != v:
+                indices[fill[v]] = u
+                edge_ids[fill[v]] = edge
+                fill[v] += 1
+
+        # drop repeated wires between the same two nodes, keeping the
+        # position of the first wire and the id of the last one
+        seen = array('i', [-1]) * count
+        slot = array('i', [0]) * count
+        size = 0
+        for node in range(count):
+            start = indptr[node]
+            indptr[node] = size
+            for k in range(start, fill[node]):
+                end = indices[k]
+                if seen[end] == node:
+                    edge_ids[slot[end]] = edge_ids[k]
+                    continue
+                seen[end] = node
+                slot[end] = size
+                indices[size] = end
+                edge_ids[size] = edge_ids[k]
+                size += 1
+        indptr[count] = size
+        del indices[size:]
+        del edge_ids[size:]
+        self.indptr = indptr
+        self.indices = indices
+        self.edge_ids = edge_ids
+        self._frozen = True
+
+    def nodeData(self):
+        """
+            yields (name, attribute dict) for each node, like networkx nodes.data()
+        """
+        for node, name in enumerate(self.names):
+            if self.ids.get(name) == node:
+                yield name, {'fuse_rating': self.fuse[node]}
+
+    def edgeData(self):
+        """
+            yields (u_name, v_name, attribute dict) for each wire, like networkx edges.data()
+        """
+        self.freeze()
+        for node, name in enumerate(self.names):
+            for k in range(self.indptr[node], self.indptr[node + 1]):
+                edge = self.edge_ids[k]
+                if self.indices[k] >= node:
+                    yield (name, self.names[self.indices[k]],
+                           {'wire': self.wire[edge], 'csa': self.csa[edge]})
+
+    @classmethod
+    def fromNetworkx(cls, graph):
+        """
+            graph: networkx graph built by GraphManager
+            returns a frozen CompactGraph with the same nodes, wires, and
+            neighbour order as graph
+        """
+        compact = cls()
+        for name, attrs in graph.nodes(data=True):
+            compact.add_node(name, fuse_rating=attrs['fuse_rating'])
+        # networkx shares one attribute dict between both directions of an edge
+        wire_of = {}
+        indptr = compact.indptr
+        for name, adj in graph.adjacency():
+            node = compact.ids[name]
+            for end, attrs in adj.items():
+                edge = wire_of.get(id(attrs))
+                if edge is None:
+                    edge = compact._addWire(node, compact.ids[end], attrs['wire'], attrs['csa'])
+                    wire_of[id(attrs)] = edge
+                compact.indices.append(compact.ids[end])
+                compact.edge_ids.append(edge)
+            indptr.append(len(compact.indices))
+        compact._frozen = True
+        return compact
@@ -0,0 +1,154 @@
+from collections import deque
+from PySide2.QtCore import QAbstractListModel, QModelIndex, Qt, QTimer, Signal
+from PySide2.QtGui import QColor
+
+# message types folded together when they repeat
+COLLAPSED_TYPES = ('error', 'warning')
+COLORS = {'error': QColor(255, 0, 0), 'warning': QColor(246, 190, 0)}
+
+
+class ConsoleModel(QAbstractListModel):
+    """
+        ConsoleModel: bounded list model behind the status console
+        Messages are queued by append() and added to the view in one batch when
+        the flush timer fires, instead of one widget item per message. Only the
+        last capacity messages are kept. An error or warning with the same text
+        as one still in the console from the same run is counted against that
+        line rather than added again.
+        Fields:
+            capacity: most lines kept, older lines are dropped
+            interval: milliseconds between flushes
+        Signals:
+            flushed(): a batch of messages was added, for the view to scroll
+        Methods:
+            append(error_code, error_type): queues a message
+            flush(): adds the queued messages to the model
+            startRun(): starts a run, whose repeats aren't folded into earlier lines
+            clear(): removes every message
+    """
+    flushed = Signal()
+
+    def __init__(self, capacity=10000, interval=100, parent=None):
+        super().__init__(parent)
+        self.capacity = capacity
+        self.interval = interval
+        # each line is [sequence number, text, type, count]
+        self._lines = deque()
+        self._kinds = {}
+        self._pending = []
+        self._next = 0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self.flush)
+
+    def rowCount(self, parent=QModelIndex()):
+        """
+            returns the number of lines in the console
+        """
+        if parent.isValid():
+            return 0
+        return len(self._lines)
+
+    def data(self, index, role=Qt.DisplayRole):
+        """
+            returns the text or color of a console line
+        """
+        if not index.isValid() or index.row() >= len(self._lines):
+            return None
+        _, text, error_type, count = self._lines[index.row()]
+        if role == Qt.DisplayRole:
+            if count > 1:
+                return text + "  (" + str(count) + " times)"
+            return text
+        if role == Qt.ForegroundRole:
+            return COLORS.get(error_type, QColor(0, 0, 0))
+        return None
+
+    def append(self, error_code, error_type):
+        """
+            error_code: message text
+            error_type: string labeled "warning", "error", or "log"
+            queues the message for the next flush
+        """
+        self._pending.append((str(error_code), error_type))
+        if len(self._pending) >= self.capacity:
+            self.flush()
+        elif not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        """
+            adds the queued messages to the model in one batch, folding repeats
+            into the counts of earlier lines and dropping the oldest lines
+            past capacity
+        """
+        self._timer.stop()
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        added = []
+        changed = set()
+        batch_start = self._next
+        for text, error_type in pending:
+            kind = None
+            if error_type in COLLAPSED_TYPES:
+                kind = (error_type, text)
+                line = self._kinds.get(kind)
+                if line is not None:
+                    line[3] += 1
+                    if line[0] < batch_start:
+                        changed.add(line[0])
+                    continue
+            line = [self._next, text, error_type, 1]
+            self._next += 1
+            added.append(line)
+            if kind is not None:
+                self._kinds[kind] = line
+        # lines added and dropped in this same batch never reach the view
+        if len(added) > self.capacity:
+            for line in added[:-self.capacity]:
+                self._forget(line)
+            added = added[-self.capacity:]
+        overflow = len(self._lines) + len(added) - self.capacity
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            for _ in range(overflow):
+                self._forget(self._lines.popleft())
+            self.endRemoveRows()
+        if self._lines:
+            first = self._lines[0][0]
+            for sequence in changed:
+                if sequence >= first:
+                    index = self.index(sequence - first)
+                    self.dataChanged.emit(index, index, [Qt.DisplayRole])
+        if added:
+            start = len(self._lines)
+            self.beginInsertRows(QModelIndex(), start, start + len(added) - 1)
+            self._lines.extend(added)
+            self.endInsertRows()
+        self.flushed.emit()
+
+    def _forget(self, line):
+        kind = (line[2], line[1])
+        if self._kinds.get(kind) is line:
+            del self._kinds[kind]
+
+    def startRun(self):
+        """
+            adds the messages queued so far, then starts counting repeats afresh,
+            so messages of a new run get lines of their own
+        """
+        self.flush()
+        self._kinds.clear()
+
+    def clear(self):
+        """
+            removes every message, including ones not yet flushed
+        """
+        self._timer.stop()
+        self._pending = []
+        self.beginResetModel()
+        self._lines.clear()
+        self._kinds.clear()
+        self.endResetModel()
@@ -1,33 +1,105 @@
+import csv
+import json
+import math
 from os import path
 from pathlib import Path
-from openpyxl import Workbook
-from openpyxl.worksheet.dimensions import ColumnDimension, DimensionHolder
-from openpyxl.utils import get_column_letter
+from sheetwriter import SheetWriter
+from traceresult import joinRecord
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    # parquet and arrow files are only offered when pyarrow is installed
+    pa = None
+    pq = None
+
+HEADER = ["Starting Component | PIN", "Ending Component | PIN", "Minimum CSA",
+          "Wires", "Splice(s)"]
+# sheet of the nodes and wires no pdc feeds and the dangling splices, after the trace
+UNFED_TITLE = "Unfed & Dangling"
+UNFED_HEADER = ["Issue", "Component | PIN", "Wire", "Other End"]
+# field names of the trace columns in JSON Lines, Parquet, and Arrow files
+FIELDS = ["start", "end", "min_csa", "wires", "splices"]
+# trace file formats by extension, the first is the default
+FORMATS = {'.xlsx': "Excel Files", '.csv': "CSV Files", '.jsonl': "JSON Lines Files",
+           '.parquet': "Parquet Files", '.arrow': "Arrow IPC Files"}
+ARROW_FORMATS = ('.parquet', '.arrow')
+# rows gathered into each record batch of a parquet or arrow file
+BATCH_ROWS = 65536
+# pyarrow type of the column of each Rule kind
+ARROW_KINDS = {'string': 'string', 'float': 'float64', 'int': 'int64', 'bool': 'bool_'}
+
+
+def availableFormats():
+    """
+        returns the extensions of the trace file formats that can be written,
+        leaving out parquet and arrow when pyarrow isn't installed
+    """
+    return [x for x in FORMATS if pa is not None or x not in ARROW_FORMATS]
+
+
+def fileFilters():
+    """
+        returns the file dialog filter string listing each trace file format that
+        can be written
+    """
+    return ';;'.join(FORMATS[x] + " (*" + x + ")" for x in availableFormats())
+
+
+def filterExtension(file_filter):
+    """
+        file_filter: one of the filters from fileFilters(), as picked in the dialog
+        returns the extension of the filter's format, or None if it isn't one of them
+    """
+    for ext, name in FORMATS.items():
+        if file_filter == name + " (*" + ext + ")":
+            return ext
+    return None
+
+
+def finiteRecord(record):
+    """
+        record: trace record from GraphManager.traceRecords
+        returns the record with a min_csa that isn't a finite number as None
+    """
+    if isinstance(record[2], float) and not math.isfinite(record[2]):
+        return record[:2] + [None] + record[3:]
+    return record
 
 
 class ExportManager:
     """
-        ExportManager: Exports data to an excel worksheet
+        ExportManager: Exports trace rows to an excel worksheet or another file format
         Fields:
             fpath: the file path to write the worksheet to
         Methods:
             setFilePath(file_path): setter for file_path
-            exportToExcel(file_path, rows): writes rows to an excel worksheet
-                at file_path
+            exportTrace(records, unfed, rules): writes trace records to save_path in
+                the format of its extension
+            exportToExcel(rows, unfed, rules): writes rows to an excel worksheet
+            exportToCsv(rows, rules): writes rows to a CSV file
+            exportToJsonLines(records, rules): writes records as one JSON object per line
+            exportToParquet(records, rules): writes records to a Parquet file, needs pyarrow
+            exportToArrow(records, rules): writes records to an Arrow IPC file, needs
+                pyarrow
+        The rules of the graph the records were traced on each add a column after
+        the trace columns.
     """
 
     def __init__(self, gui):
         self.save_path = path.normpath(path.join(Path.home().as_posix(), "output.xlsx"))
         self.gui = gui
 
-    def setSavePath(self, file_path):
+    def setSavePath(self, file_path, extension=None):
         """
             setter for file path attributes
+            extension: format extension to add when file_path doesn't end in one
+                of FORMATS, defaults to .xlsx
         """
-        if '.xlsx' in file_path:
+        if path.splitext(str(file_path))[1].lower() in FORMATS:
             self.save_path = str(file_path)
         else:
-            self.save_path = str(file_path) + ".xlsx"
+            self.save_path = str(file_path) + (extension or ".xlsx")
 
     def getSavePath(self):
         """
@@ -35,32 +107,153 @@ class ExportManager:
         """
         return self.save_path
 
-    def exportToExcel(self, rows):
+    def exportTrace(self, records, unfed=None, rules=()):
+        """
+            records: iterable of trace records from GraphManager.traceRecords, with
+                the wires and splices as lists of names
+            unfed: rows from GraphManager.unfedRows, or None
+            rules: the Rules of the graph, whose entries follow the trace columns
+            writes the records to save_path with the writer for its extension. The
+            worksheet and CSV writers take them as rows with the names comma
+            separated, joined one row at a time as they are written. The unfed rows
+            are only saved in a worksheet, as a second sheet.
+            returns False if the format can't be written
+        """
+        extension = path.splitext(self.save_path)[1].lower()
+        if unfed and extension != '.xlsx':
+            log = str(len(unfed)) + " unfed and dangling rows are only saved in .xlsx files"
+            self.gui.reportError(log, "warning")
+        writers = {'.jsonl': self.exportToJsonLines, '.parquet': self.exportToParquet,
+                   '.arrow': self.exportToArrow}
+        if extension in writers:
+            return writers[extension](records, rules) is not False
+        rows = (joinRecord(x) for x in records)
+        if extension == '.csv':
+            self.exportToCsv(rows, rules)
+        else:
+            self.exportToExcel(rows, unfed, rules)
+        return True
+
+    def _logSave(self):
+        log = "saving trace to: " + str(self.save_path)
+        print(log)
+        self.gui.reportError(log, "log")
+
+    def exportToExcel(self, rows, unfed=None, rules=()):
         """
             Writes data to the excel file in fpath.
-            rows: 2-dimensional indexed collection (such as a list of lists,
-                or tuple of tuples). Each element in the outer collection will
-                be read as a row to be written to the worksheet.
+            rows: iterable of rows, such as a list of tuples or a generator.
+                Each row is written to the sheet as it is taken, so memory
+                stays flat however many rows there are.
+            unfed: rows from GraphManager.unfedRows written to an UNFED_TITLE
+                sheet after the trace, or None to leave the sheet out
+            rules: Rules whose columns follow the trace columns
         """
+        self._logSave()
+        header = HEADER + [x.name for x in rules]
+        with SheetWriter(self.save_path, [25] * len(header)) as works:
+            works.append(header)
+            # write rows
+            for row in rows:
+                works.append(row)
+            if unfed is not None:
+                works.addSheet(UNFED_TITLE, [25] * len(UNFED_HEADER))
+                works.append(UNFED_HEADER)
+                for row in unfed:
+                    works.append(row)
 
-        # create workbook
-        workb = Workbook()
-        works = workb.active
+    def exportToCsv(self, rows, rules=()):
+        """
+            rows: iterable of trace rows
+            rules: Rules whose columns follow the trace columns
+            writes the header and each row to a CSV file as they are taken,
+            with the wires and splices comma separated as in the worksheet
+        """
+        self._logSave()
+        with open(self.save_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(HEADER + [x.name for x in rules])
+            for row in rows:
+                record = list(row)
+                if isinstance(record[2], float) and not math.isfinite(record[2]):
+                    record[2] = None
+                writer.writerow(record)
 
-        first_row = ["Starting Component | PIN", "Ending Component | PIN", "Minimum CSA",
-                     "Wires", "Splice(s)"]
-        works.append(first_row)
-        # write rows
-        for row in rows:
-            works.append(row)
-        # save workbook
-        dim_holder = DimensionHolder(worksheet=works)
+    def exportToJsonLines(self, records, rules=()):
+        """
+            records: iterable of trace records
+            rules: Rules whose entries follow the trace fields
+            writes each record as a JSON object on its own line, with FIELDS keys
+            and the field of each rule, and the wires and splices as lists
+        """
+        self._logSave()
+        fields = FIELDS + [x.field for x in rules]
+        with open(self.save_path, 'w', encoding='utf-8') as file:
+            for record in records:
+                file.write(json.dumps(dict(zip(fields, finiteRecord(record)))))
+                file.write('\n')
 
-        for col in range(works.min_column, works.max_column + 1):
-            dim_holder[get_column_letter(col)] = ColumnDimension(works, min=col, max=col, width=25)
+    def _arrowBatches(self, records, rules):
+        """
+            records: iterable of trace records
+            rules: Rules whose columns follow the trace columns
+            yields record batches of up to BATCH_ROWS rows, with the wires and
+            splices as list columns
+        """
+        schema = self._arrowSchema(rules)
+        columns = [[] for _ in schema]
+        for record in records:
+            for column, value in zip(columns, finiteRecord(record)):
+                column.append(value)
+            if len(columns[0]) >= BATCH_ROWS:
+                yield pa.record_batch(columns, schema=schema)
+                columns = [[] for _ in schema]
+        if columns[0]:
+            yield pa.record_batch(columns, schema=schema)
 
-        works.column_dimensions = dim_holder
-        log = "saving trace to: " + str(self.save_path)
-        print(log)
-        self.gui.reportError(log, "log")
-        workb.save(self.save_path)
+    @staticmethod
+    def _arrowSchema(rules=()):
+        fields = [("start", pa.string()), ("end", pa.string()), ("min_csa", pa.float64()),
+                  ("wires", pa.list_(pa.string())), ("splices", pa.list_(pa.string()))]
+        fields.extend((x.field, getattr(pa, ARROW_KINDS[x.kind])()) for x in rules)
+        return pa.schema(fields)
+
+    def _needArrow(self):
+        """
+            reports an error and returns False when pyarrow isn't installed
+        """
+        if pa is not None:
+            return True
+        needs = "saving " + path.basename(self.save_path) + " needs the pyarrow package"
+        self.gui.reportError(needs + ", install it or save as .xlsx", "error")
+        return False
+
+    def exportToParquet(self, records, rules=()):
+        """
+            records: iterable of trace records
+            rules: Rules whose columns follow the trace columns
+            writes the rows to a Parquet file one record batch at a time.
+            returns False if pyarrow isn't installed
+        """
+        if not self._needArrow():
+            return False
+        self._logSave()
+        with pq.ParquetWriter(self.save_path, self._arrowSchema(rules)) as writer:
+            for batch in self._arrowBatches(records, rules):
+                writer.write_batch(batch)
+        return True
+
+    def exportToArrow(self, records, rules=()):
+        """
+            records: iterable of trace records
+            rules: Rules whose columns follow the trace columns
+            writes the rows to an Arrow IPC file one record batch at a time.
+            returns False if pyarrow isn't installed
+        """
+        if not self._needArrow():
+            return False
+        self._logSave()
+        with pa.ipc.new_file(self.save_path, self._arrowSchema(rules)) as writer:
+            for batch in self._arrowBatches(records, rules):
+                writer.write_batch(batch)
+        return True
@@ -1,32 +1,102 @@
+from array import array
+import heapq
 import math
 import networkx as nx
+from chaingraph import ChainGraph
+from compactgraph import CompactGraph
+from rules import Rule
+from traceresult import ComponentTrace, PdcTrace, joinRecord
 
 
 class GraphManager:
     """
         GraphManager: Class to handle graph operations, reading, writing, traversal
         Fields:
-            _g: The networkx graph on which to perform operations
+            rules: Rules every trace is checked with, each adding a column to the rows.
+                Changed with addRule and removeRule
+            _fold: the rules' callbacks from _ruleHooks()
+            _g: The networkx graph on which to perform operations, or a CompactGraph
+                when created with backend='compact'
+            _view: frozen CompactGraph the traces run on, or None until the graph
+                is traced after a change
+            _chains: ChainGraph of _view, with its inline pass-throughs contracted,
+                or None until the graph is traced after a change
+            _components: sorted pdc id lists of each connected component that holds a pdc,
+                or None until the graph is split after a change
+            _keys: names of the pdcs in each component, which identify its trace results
+            _loop_free: True for each component whose chains form a tree, which
+                needs no loop search
+            _component_of: component index of each junction id, -1 outside those
+                components and for the inner nodes of chains
+            _parent, _link, _dist: parent junction id, chain id to the parent, and
+                number of wires from the pdc of each junction reached by the last
+                _sweep()
+            _seen: 1 for each junction _sweep() has reached, cleared once it's done
+            _analysis: ComponentTrace of each component keyed by _keys, filled in as
+                components are traced and kept for components a change doesn't touch
+            _touched: names of the nodes whose wires or fuse rating changed since the
+                graph was last split
+            _report_ids: source id of each report added, with filepath keys
+            _next_source: source id of the next report added
+            _node_sources: source ids of the reports that use each node, with node
+                name keys. A node no report uses is removed unless it's in a fuse map
         Methods:
             addPDC(pdc_list): adds the specified PDC list to the graph and updates fuse rating
             addReport(): adds the specified report object to the graph, creating edges between from
                 and to (component, pin) combinations
                 with attributes
+            removeReport(report): takes the wires of a report back out of the graph
+            replaceReport(old, new): swaps the wires of one report for another's
+            unfedRows(): lists the nodes and wires no pdc feeds and the dangling splices
+            addRule(rule): checks the traces with another rule
+            removeRule(rule): stops checking the traces with a rule
             printNodes():
                 prints all the nodes currently in the graph
             printEdges:
                 prints all edges currently in the graph
     """
 
-    def __init__(self, gui):
-        self._g = nx.Graph()
+    def __init__(self, gui, backend='networkx', rules=None):
+        """
+            gui: object with a reportError method
+            backend: 'networkx', or 'compact' for a CompactGraph
+            rules: Rules to check the traces with, none unless given
+        """
+        self.rules = [] if rules is None else list(rules)
+        self._fold = self._ruleHooks()
+        if backend == 'compact':
+            self._g = CompactGraph()
+        else:
+            self._g = nx.Graph()
         self.gui = gui
+        self._report_ids = {}
+        self._next_source = 0
+        self._node_sources = {}
+        # trace results of each component by key, and names changed since the split
+        self._analysis = {}
+        self._touched = set()
+        # the graph views, component split, and sweep arrays, built on the first
+        # trace after a change and dropped again by _changed
+        self._view = None
+        self._chains = None
+        self._components = None
+        self._keys = None
+        self._loop_free = None
+        self._component_of = None
+        self._parent = None
+        self._link = None
+        self._dist = None
+        self._seen = None
 
     def printNodes(self):
         """
             prints all nodes in the graph, one per line
         """
-        for node in list(self._g.nodes.data()):
+        if isinstance(self._g, CompactGraph):
+            nodes = self._g.nodeData()
+        else:
+            nodes = self._g.nodes.data()
+        for node in list(nodes):
             print(node)
 
     def clearGraph(self):
@@ -34,13 +104,20 @@ class GraphManager:
             clears all data from graph
         """
         self._g.clear()
+        self._report_ids.clear()
+        self._node_sources.clear()
+        self._resetAnalysis()
         print("graph is now empty")
 
     def printEdges(self):
         """
             prints all edges in the graph, one per line
         """
-        for edge in list(self._g.edges.data()):
+        if isinstance(self._g, CompactGraph):
+            edges = self._g.edgeData()
+        else:
+            edges = self._g.edges.data()
+        for edge in list(edges):
             print(edge)
 
     def addPDC(self, pdc_list):
@@ -62,12 +139,13 @@ class GraphManager:
                 self.gui.reportError(err_str, 'error')
                 return False
 
+            self._changed([vname])
             # if vertex doesn't exist, create it
             if vname not in self._g:
                 self._g.add_node(vname, connector=vconn, pin=vpin, fuse_rating=vfuse)
             # if vertex exists, update fuse rating
             else:
-                self._g.nodes[vname]['fuse_rating'] = vfuse
+                self._g.add_node(vname, fuse_rating=vfuse)
 
         self.gui.reportError("added pdc to graph", "log")
         return True
@@ -77,154 +155,768 @@ class GraphManager:
             report: report object to add (from InputParser.readReport())
             Adds nodes from a wire report object to the graph. Graph cannot be empty.
             adds wires between nodes in the report, updating wire csa and wire description
+            The report's WireTable is added column by column rather than row by row.
+            Each wire and node remembers the reports it came from, for removeReport()
         """
-        contents = report.getContents()
-
-        for row in contents:
-            f_tup = row["FROM"]
-            t_tup = row["TO"]
-            wire_desc = row["DESC"]
-            wire_csa = row["CSA"]
-            # get vertex information
-            fconn = str(f_tup[0])
-            fpin = str(f_tup[1])
-            tconn = str(t_tup[0])
-            tpin = str(t_tup[1])
-            # ignore the pin for splice entries
-            if fconn[0] != 'S':
-                fname = fconn + "|" + fpin
-            else:
-                fname = fconn
-            if tconn[0] != 'S':
-                tname = tconn + "|" + tpin
-            else:
-                tname = tconn
-
-            # create new vertices with a negative fuse rating
-            if fname not in self._g:
-                self._g.add_node(fname, connector=fconn, pin=fpin, fuse_rating=-1)
-            if tname not in self._g:
-                self._g.add_node(tname, connector=tconn, pin=tpin, fuse_rating=-1)
-            # create wire between the two components
-            self._g.add_edge(fname, tname, wire=wire_desc, csa=wire_csa)
+        table = report.getContents()
+        source = self._report_ids.get(report.filepath)
+        if source is None:
+            # ids aren't reused, so a removed report's wires never come back
+            source = self._next_source
+            self._next_source += 1
+            self._report_ids[report.filepath] = source
+        from_nodes = self._addTableNodes(table, table.from_conn, table.from_pin)
+        to_nodes = self._addTableNodes(table, table.to_conn, table.to_pin)
+        # create wires between the components
+        if isinstance(self._g, CompactGraph):
+            self._g.addWires(from_nodes, to_nodes, table.csa, table.wire, source)
+            names = self._g.names
+            touched = {names[x] for x in set(from_nodes).union(to_nodes)}
+        else:
+            for fname, tname, csa, wire in zip(from_nodes, to_nodes, table.csa, table.wire):
+                attrs = self._g.get_edge_data(fname, tname)
+                if attrs is None:
+                    self._g.add_edge(fname, tname, wire=wire, csa=csa,
+                                     sources={source: (wire, csa)})
+                    continue
+                # a later wire between the same nodes takes the place of the
+                # earlier one, until its report is removed again
+                attrs['wire'] = wire
+                attrs['csa'] = csa
+                attrs['sources'].pop(source, None)
+                attrs['sources'][source] = (wire, csa)
+            touched = set(from_nodes).union(to_nodes)
+        for name in touched:
+            self._node_sources.setdefault(name, set()).add(source)
+        self._changed(touched)
         stmt = 'added ' + str(report.filename) + ' to graph'
         self.gui.reportError(stmt, "log")
 
+    def removeReport(self, report):
+        """
+            report: report object added with addReport()
+            Removes the wires the report added. A wire between two nodes that
+            another report also connects is handed back to that report's wire.
+            Nodes no other report uses are removed too, unless they're in a fuse map.
+            Returns False if the report wasn't added
+        """
+        source = self._report_ids.pop(report.filepath, None)
+        if source is None:
+            return False
+        self._removeSource(source, report)
+        return True
+
+    def replaceReport(self, old, new):
+        """
+            old: report object added with addReport()
+            new: report object to add in its place, such as a newer read of the
+                same file or another variant of the harness
+            Adds the wires of new and then removes the wires of old, so nodes both
+            reports use are kept. Only the components holding nodes of either
+            report are traced again. Returns False if old wasn't added, in which
+            case new is still added
+        """
+        source = self._report_ids.pop(old.filepath, None)
+        self.addReport(new)
+        if source is None:
+            return False
+        self._removeSource(source, old)
+        return True
+
+    def _removeSource(self, source, report):
+        """
+            source: source id the report was added with, no longer in _report_ids
+            report: report object added with that source id
+            removes the report's wires and the nodes left without a report
+        """
+        table = report.getContents()
+        from_names = self._tableNodeNames(table, table.from_conn, table.from_pin)
+        to_names = self._tableNodeNames(table, table.to_conn, table.to_pin)
+        touched = set(from_names).union(to_names)
+        if isinstance(self._g, CompactGraph):
+            self._g.removeSource(source)
+        else:
+            for fname, tname in zip(from_names, to_names):
+                attrs = self._g.get_edge_data(fname, tname)
+                if attrs is None or source not in attrs['sources']:
+                    continue
+                del attrs['sources'][source]
+                if attrs['sources']:
+                    attrs['wire'], attrs['csa'] = next(reversed(attrs['sources'].values()))
+                else:
+                    self._g.remove_edge(fname, tname)
+        # every wire comes from a report, so a node no report uses has none left
+        orphans = []
+        for name in touched:
+            sources = self._node_sources.get(name)
+            if sources is None:
+                continue
+            sources.discard(source)
+            if not sources:
+                del self._node_sources[name]
+                if self._fuseRating(name) < 0:
+                    orphans.append(name)
+        if isinstance(self._g, CompactGraph):
+            self._g.removeNodes([self._g.ids[x] for x in orphans])
+        else:
+            self._g.remove_nodes_from(orphans)
+        self._changed(touched)
+        stmt = 'removed ' + str(report.filename) + ' from graph'
+        self.gui.reportError(stmt, "log")
+
+    def _fuseRating(self, name):
+        """
+            name: node name in the graph
+            returns the fuse rating of the node, negative when not in a fuse map
+        """
+        if isinstance(self._g, CompactGraph):
+            return self._g.fuse[self._g.ids[name]]
+        return self._g.nodes[name]['fuse_rating']
+
+    def _tableNodeNames(self, table, conns, pins):
+        """
+            table: WireTable added to the graph
+            conns, pins: string id columns of table for one end of its wires
+            returns the node name at that end of each wire
+        """
+        strings = table.strings
+        names = []
+        known = {}
+        width = len(strings)
+        for conn, pin in zip(conns, pins):
+            name = known.get(conn * width + pin)
+            if name is None:
+                vconn = strings[conn]
+                # ignore the pin for splice entries
+                name = vconn + "|" + strings[pin] if vconn[:1] != 'S' else vconn
+                known[conn * width + pin] = name
+            names.append(name)
+        return names
+
+    def _addTableNodes(self, table, conns, pins):
+        """
+            table: WireTable being added to the graph
+            conns, pins: string id columns of table for one end of its wires
+            Creates missing nodes with a negative fuse rating, building each
+            node name once per distinct (component, pin) in the table.
+            Returns the node at that end of each wire, as node ids for the
+            compact backend and node names for networkx
+        """
+        strings = table.strings
+        compact = isinstance(self._g, CompactGraph)
+        nodes = array('i') if compact else []
+        known = {}
+        width = len(strings)
+        for conn, pin in zip(conns, pins):
+            node = known.get(conn * width + pin)
+            if node is None:
+                vconn = strings[conn]
+                vpin = strings[pin]
+                # ignore the pin for splice entries
+                if vconn[:1] != 'S':
+                    name = vconn + "|" + vpin
+                else:
+                    name = vconn
+                if compact:
+                    node = self._g.add_node(name)
+                else:
+                    node = name
+                    if name not in self._g:
+                        self._g.add_node(name, connector=vconn, pin=vpin, fuse_rating=-1)
+                known[conn * width + pin] = node
+            nodes.append(node)
+        return nodes
+
+    def addRule(self, rule):
+        """
+            rule: Rule to check the traces with, after the rules already added.
+                It runs in the same sweep as the others and adds a column to the rows
+        """
+        self.rules.append(rule)
+        self._fold = self._ruleHooks()
+        # the kept trace results don't hold the new rule's values
+        self._analysis = {}
+
+    def removeRule(self, rule):
+        """
+            rule: Rule added to the graph
+            stops checking the traces with the rule. Returns False if it wasn't added
+        """
+        if rule not in self.rules:
+            return False
+        self.rules.remove(rule)
+        self._fold = self._ruleHooks()
+        self._analysis = {}
+        return True
+
+    def _resetAnalysis(self):
+        """
+            drops the component split and every trace result
+        """
+        self._analysis = {}
+        self._touched = set()
+        self._changed(())
+
+    def _changed(self, names):
+        """
+            names: names of the nodes whose wires or fuse rating changed
+            drops the component split after the graph changes. Trace results are
+            kept until the next split, which drops the ones of touched components
+        """
+        self._touched.update(names)
+        self._view = None
+        self._chains = None
+        self._components = None
+        self._keys = None
+        self._loop_free = None
+        self._component_of = None
+        self._parent = None
+        self._link = None
+        self._dist = None
+        self._seen = None
+
+    def _compactView(self):
+        """
+            returns the frozen CompactGraph to trace on, converting
+            the networkx graph once per change to the graph
+        """
+        if self._view is None:
+            if isinstance(self._g, CompactGraph):
+                self._g.freeze()
+                self._view = self._g
+            else:
+                self._view = CompactGraph.fromNetworkx(self._g)
+        return self._view
+
+    def _chainView(self):
+        """
+            returns the ChainGraph of the compact view, contracting its inline
+            pass-throughs once per change to the graph
+        """
+        if self._chains is None:
+            self._chains = ChainGraph(self._compactView())
+        return self._chains
+
+    def _splitComponents(self):
+        """
+            Splits the graph into connected components once per change to the graph,
+            flooding out from each pdc along the chains. Components without a pdc are
+            never visited, as nothing is traced from them. Trace results are kept for
+            the components that hold no touched node, as they are unchanged.
+            Returns the sorted pdc id list of each component
+        """
+        if self._components is not None:
+            return self._components
+        chains = self._chainView()
+        graph = chains.graph
+        indptr, indices = chains.indptr, chains.indices
+        self._components = []
+        self._loop_free = []
+        self._component_of = array('i', [-1]) * len(graph)
+        self._parent = array('i', [-1]) * len(graph)
+        self._link = array('i', [-1]) * len(graph)
+        self._dist = array('i', [-1]) * len(graph)
+        self._seen = bytearray(len(graph))
+        pdcs = sorted((x for x in range(len(graph)) if graph.fuse[x] >= 0),
+                      key=graph.names.__getitem__)
+        for pdc in pdcs:
+            index = self._component_of[pdc]
+            if index >= 0:
+                self._components[index].append(pdc)
+                continue
+            index = len(self._components)
+            self._components.append([pdc])
+            self._component_of[pdc] = index
+            junctions = 0
+            entries = 0
+            stack = [pdc]
+            while stack:
+                node = stack.pop()
+                junctions += 1
+                entries += indptr[node + 1] - indptr[node]
+                for k in range(indptr[node], indptr[node + 1]):
+                    if self._component_of[indices[k]] < 0:
+                        self._component_of[indices[k]] = index
+                        stack.append(indices[k])
+            # every chain is listed from both its ends, but a single wire from a
+            # node to itself only once, so only a tree has two entries per chain
+            self._loop_free.append(entries == 2 * (junctions - 1))
+
+        names = graph.names
+        self._keys = [tuple(names[x] for x in pdcs) for pdcs in self._components]
+        touched = set()
+        # with no results kept there is nothing to drop
+        for name in self._touched if self._analysis else ():
+            node = graph.ids.get(name)
+            if node is None:
+                continue
+            # inner nodes of a chain are in the component of its junctions
+            if chains.chain_of[node] >= 0:
+                node = chains.chain_u[chains.chain_of[node]]
+            touched.add(self._component_of[node])
+        self._analysis = {key: self._analysis[key] for index, key in enumerate(self._keys)
+                          if index not in touched and key in self._analysis}
+        self._touched = set()
+        return self._components
+
+    def _analyseComponent(self, index):
+        """
+            index: position of the component in _components
+            Finds the loops of the component once for all of its pdcs. A loop whose
+            head is a splice isn't reported, and its wires stay in the endpoint rows.
+            A loop can carry the current of any pdc of the component, so the rules
+            of the loop rows start from the pdc with the largest fuse rating, the
+            first by name on a tie, rather than from whichever pdc sorts first.
+            Returns the ComponentTrace of the component, without pdc trees until
+            _tracePdc() adds them
+        """
+        pdcs = self._splitComponents()[index]
+        key = self._keys[index]
+        if key in self._analysis:
+            return self._analysis[key]
+
+        chains = self._chainView()
+        names = chains.graph.names
+        chain_u = chains.chain_u
+        trace = ComponentTrace([names[x] for x in pdcs], tuple(self.rules))
+        fold = self._fold
+        start = ()
+        if fold:
+            fuse = chains.graph.fuse
+            feed = max(pdcs, key=lambda x: fuse[x])
+            start = tuple(x.start(names[feed], fuse[feed]) for x in self.rules)
+        for nodes, loop in [] if self._loop_free[index] else self._indexLoops(pdcs[0]):
+            # if the start of the loop is a splice, don't record the loop
+            if names[nodes[0]][0] == 'S':
+                continue
+            # keep the loop wires out of the endpoint traces
+            trace.loop_chains.update(loop)
+            wires = []
+            values = start
+            for i, chain in enumerate(loop):
+                reverse = chain_u[chain] != nodes[i]
+                wires.extend(chains.wireNames(chain, reverse=reverse))
+                if fold:
+                    values = self._foldChain(fold, values, chain, 0, chains.length(chain),
+                                             reverse)
+                    if i + 1 < len(nodes):
+                        values = self._foldNode(fold, values, nodes[i + 1])
+            trace.addLoop([names[x] for x in nodes], wires, min(chains.csa[x] for x in loop),
+                          values)
+
+        self._analysis[key] = trace
+        return trace
+
+    def _tracePdc(self, trace, pdc):
+        """
+            trace: ComponentTrace of the component holding pdc
+            pdc: node id of a pdc
+            Sweeps the whole component from the pdc, so every endpoint it reaches is
+            traced from it, whichever other pdcs reach it too. A junction that is
+            nobody's parent is an endpoint. The chains the sweep doesn't take only
+            close loops, and are split between their ends by _splitChains().
+            Returns the PdcTrace of the pdc, kept in trace until dropped
+        """
+        chains = self._chainView()
+        names = chains.graph.names
+        tree = trace.trees.get(names[pdc])
+        if tree is not None:
+            return tree
+        chain_u = chains.chain_u
+        parent, link = self._parent, self._link
+        loop_chains = trace.loop_chains
+        order = self._sweep(pdc)
+        tree = PdcTrace(trace.rules)
+        # the rules fold their values down the tree as each node is added
+        fold = self._fold
+        values = ()
+        if fold:
+            values = tuple(x.start(names[pdc], chains.graph.fuse[pdc]) for x in self.rules)
+        tree.addNode(names[pdc], -1, (), 0, False, values)
+        # the junctions are added in order, so their positions follow it
+        position = dict(zip(order, range(len(order))))
+        for node in order[1:]:
+            chain = link[node]
+            wires = chains.wireNames(chain, reverse=chain_u[chain] == parent[node])
+            on_loop = chain in loop_chains
+            if fold:
+                values = tree.values[position[parent[node]]]
+                # loop wires are left out of the rows, and so out of their rules
+                if not on_loop:
+                    values = self._foldChain(fold, values, chain, 0, len(wires),
+                                             chain_u[chain] != parent[node])
+                values = self._foldNode(fold, values, node)
+            tree.addNode(names[node], position[parent[node]], wires, chains.csa[chain], on_loop,
+                         values)
+
+        parents = {parent[x] for x in order}
+        if not self._loop_free[self._component_of[pdc]]:
+            self._splitChains(tree, order, position, parents, loop_chains)
+        for node in order[1:]:
+            # wires that close a loop were already reported with the loop
+            if node not in parents and link[node] not in loop_chains:
+                tree.addEndpoint(position[node])
+        trace.trees[names[pdc]] = tree
+        return tree
+
+    def _splitChains(self, tree, order, position, parents, loop_chains):
+        """
+            tree: PdcTrace being built
+            order: junction ids in the order the last _sweep() reached them
+            position: position of each junction in order
+            parents: junction ids that are a parent, updated in place
+            loop_chains: chain ids of the reported loops
+            Shares the inner nodes of each chain the sweep didn't take between its
+            ends by the number of wires from the pdc, as a breadth-first trace over
+            every node would, and ties go to the end the sweep reached first.
+            An end that reaches an inner node is a parent. Chains of a reported
+            loop were already reported with it, but the last inner node reached
+            from each end of any other chain, such as one of a loop whose head is
+            a splice, is added as an endpoint
+        """
+        chains = self._chainView()
+        names = chains.graph.names
+        indptr, indices, edge_ids = chains.indptr, chains.indices, chains.edge_ids
+        link, dist = self._link, self._dist
+        fold = self._fold
+        split = set()
+        for node in order:
+            for k in range(indptr[node], indptr[node + 1]):
+                chain = edge_ids[k]
+                length = chains.length(chain)
+                if length < 2 or chain in split or chain in (link[node], link[indices[k]]):
+                    continue
+                split.add(chain)
+                u, v = chains.chain_u[chain], chains.chain_v[chain]
+                # inner node i is nearer chain_u when dist[u] + i < dist[v] + length - i
+                reach = dist[v] + length - dist[u]
+                count = (reach - 1) // 2
+                if reach % 2 == 0 and position[u] <= position[v]:
+                    count += 1
+                count = max(0, min(length - 1, count))
+                if count > 0:
+                    parents.add(u)
+                if count < length - 1:
+                    parents.add(v)
+                if chain in loop_chains:
+                    continue
+                inner = chains.chainInner(chain)
+                wires = chains.wireNames(chain)
+                offset = chains.wire_start[chain]
+                csas = chains.wire_csa[offset:offset + length]
+                # (junction, leaf, wire slice, reversed) of the part from each end
+                for end, leaf, start, stop, reverse in ((u, count - 1, 0, count, False),
+                                                        (v, count, count + 1, length, True)):
+                    if start >= stop:
+                        continue
+                    values = tree.values[position[end]]
+                    if fold:
+                        values = self._foldChain(fold, values, chain, start, stop, reverse)
+                    csa = math.inf
+                    for x in csas[start:stop]:
+                        if x < csa:
+                            csa = x
+                    # the wires from the leaf back up to the junction
+                    path = wires[start:stop]
+                    if not reverse:
+                        path.reverse()
+                    tree.addEndpoint(tree.addNode(names[inner[leaf]], position[end], path,
+                                                  csa, False, values))
+
+    def _ruleHooks(self):
+        """
+            returns the (position, callback) pairs of the edge and node callbacks
+            the rules override, or None without rules, so the fold skips the rest.
+            Taken again whenever the rules change
+        """
+        if not self.rules:
+            return None
+        edges = [(i, x.edge) for i, x in enumerate(self.rules) if type(x).edge is not Rule.edge]
+        nodes = [(i, x.node) for i, x in enumerate(self.rules) if type(x).node is not Rule.node]
+        return edges, nodes
+
+    def _foldChain(self, fold, values, chain, start, stop, reverse):
+        """
+            fold: rule callbacks from _ruleHooks()
+            values: tuple of the rule values at the node the walk starts from
+            chain: chain id
+            start, stop: slice of the chain's wires counted from chain_u
+            reverse: walk from chain_v back towards chain_u
+            returns the rule values after each wire of the slice and each inner
+            node the wires reach, in walking order
+        """
+        edges, nodes = fold
+        if not edges and not nodes:
+            return values
+        chains = self._chains
+        offset = chains.wire_start[chain]
+        wire_names = chains.wire_names[offset + start:offset + stop]
+        csas = chains.wire_csa[offset + start:offset + stop]
+        if reverse:
+            wire_names.reverse()
+            csas.reverse()
+        values = list(values)
+        if not nodes:
+            # without node callbacks each rule takes the wires in one run
+            for i, edge in edges:
+                value = values[i]
+                for name, csa in zip(wire_names, csas):
+                    value = edge(value, name, csa)
+                values[i] = value
+            return tuple(values)
+        # wire k joins inner node k - 1 to inner node k, so the walk reaches inner
+        # nodes start to stop - 1 forwards, and stop - 2 down to start - 1 in reverse
+        inner = chains.chainInner(chain)
+        reached = range(stop - 2, start - 2, -1) if reverse else range(start, stop)
+        names = chains.graph.names
+        for name, csa, reach in zip(wire_names, csas, reached):
+            for i, edge in edges:
+                values[i] = edge(values[i], name, csa)
+            if 0 <= reach < len(inner):
+                for i, node in nodes:
+                    values[i] = node(values[i], names[inner[reach]])
+        return tuple(values)
+
+    def _foldNode(self, fold, values, node):
+        """
+            fold: rule callbacks from _ruleHooks()
+            values: tuple of the rule values on reaching the node
+            node: node id
+            returns the rule values after the node
+        """
+        if not fold[1]:
+            return values
+        values = list(values)
+        name = self._chainView().graph.names[node]
+        for i, callback in fold[1]:
+            values[i] = callback(values[i], name)
+        return tuple(values)
+
+    def _indexLoops(self, root):
+        """
+            root: node id to start the search from
+            Finds a basis of independent loops of the component holding root in one
+            depth-first pass over its chains.
+            Returns the list of (junction ids, chain ids) around each loop, where
+            chain i joins junction i to the junction after it. Each loop starts from
+            its head, the junction of it the search reached first
+        """
+        chains = self._chainView()
+        indptr, indices, edge_ids = chains.indptr, chains.indices, chains.edge_ids
+        loops = []
+
+        def addLoop(loop, wires):
+            # used holds the nodes in the order the search reached them
+            head = min(range(len(loop)), key=lambda x: rank[loop[x]])
+            loops.append((loop[head:] + loop[:head], wires[head:] + wires[:head]))
+
+        pred = {root: (root, -1)}
+        # used[node] maps each node already linked to node to the chain between them
+        used = {root: {}}
+        rank = {root: 0}
+        # chains in the search tree or already closing a loop, as two chains can
+        # join the same junctions and a chain back round to a junction is listed twice
+        done = set()
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            for k in range(indptr[node], indptr[node + 1]):
+                end = indices[k]
+                chain = edge_ids[k]
+                if chain in done:
+                    continue
+                done.add(chain)
+                if end not in used:
+                    pred[end] = (node, chain)
+                    used[end] = {node: chain}
+                    rank[end] = len(rank)
+                    stack.append(end)
+                elif end == node:
+                    addLoop([node], [chain])
+                else:
+                    # walk back up the search tree from node until reaching
+                    # a node that end was already linked from
+                    end_used = used[end]
+                    loop = [end, node]
+                    wires = [chain]
+                    walk = node
+                    while walk not in end_used:
+                        walk, wire = pred[walk]
+                        loop.append(walk)
+                        wires.append(wire)
+                    wires.append(end_used[walk])
+                    addLoop(loop, wires)
+                    end_used.setdefault(node, chain)
+        return loops
+
     def reportCycle(self, pdc):
         """
             Arguments:
                 pdc: node in the graph to check for cycle
-            Checks for a cycle within the graph from 'pdc' source.
-            if one exists, gets minimum CSA, wires, and splice points.
-            returns False if no cycle, or tuple with cycle information
-            and the set of wires traversed.
-            output format:
-            (startComponent|startPin, endComponent|endPin, min_csa, wire1, wire2, ..., wire_n,
-            splice1, splice2, etc), set_of_wires_traversed
-        """
-        # tracks the minimum CSA, wire names, and splices
-        # across each wire trace
-        min_csa = math.inf
-        wires = set()
-        splice_list = []
-        search = True
-        # check for a cycle, if no cycle, return False
-        try:
-            loop = dict(nx.find_cycle(self._g, source=pdc))
-        except nx.exception.NetworkXNoCycle:
+            Looks up the loops of the component holding 'pdc' in the shared component
+            analysis, which every pdc of the component reaches.
+            returns False if no cycle, or a tuple of the list of loop rows and the set
+            of wires on those loops. Each row has the traceWires output format:
+            (loopComponent|loopPin, loopComponent|loopPin, min_csa, wire1, wire2, ..., wire_n,
+            splice1, splice2, etc)
+        """
+        graph = self._compactView()
+        self._splitComponents()
+        if pdc not in graph.ids or self._component_of[graph.ids[pdc]] < 0:
             return False
-        else:
-            # transform values to expected list format
-            # for consistency with bfs_successors
-            for key, value in loop.items():
-                nodes_list = []
-                if not isinstance(value, list):
-                    nodes_list.append(value)
-                    loop[key] = nodes_list
-
-            # if the start of the loop is a
-            # splice, don't record the loop
-            loop_head = list(loop)[0]
-            if loop_head[0] == 'S':
-                return False
-            while search:
-                for start, ends in loop.items():
-                    search = False
-                    # each wire, update the minimum CSA and add to
-                    # the wires list
-                    for end in ends:
-                        curr_csa = self._g[start][end]['csa']
-                        wname = self._g[start][end]['wire']
-                        if wname not in wires:
-                            wires.add(wname)
-                            if curr_csa < min_csa:
-                                min_csa = curr_csa
-                            # if a splice is detected, there is potential for more ends
-                            # a BFS is needed to record all the wires.
-                            # set 'search' flag to update the iterator
-                            if end[0] == 'S':
-                                splice_list.append(end)
-                                loop = loop | dict(nx.bfs_successors(self._g, end))
-                                search = True
-
-            return ((loop_head, loop_head, min_csa, ', '.join(wires), ', '.join(splice_list)),
-                    wires)
-
-    def traceWires(self):
+        index = self._component_of[graph.ids[pdc]]
+        return self._analyseComponent(index).cycle()
+
+    def traceWires(self, keep=True):
         """
+            keep: keep the trace results for later calls, False drops the results of
+                each component once its rows are yielded, so only the components
+                still being yielded are held in memory
             Traces each wire in the pdc to it's endpoint(s).
             Outputs the start and end component/pin, each wire, and the
             minimum CSA of all wires in the path
+            Each PDC is traced over the whole of its connected component, so an
+            endpoint reachable from several PDCs is reported under each of them,
+            and other PDCs it reaches are endpoints too. The loops of a component
+            are found once for all of its PDCs, and components without a PDC are
+            never visited. Runs of inline connectors are contracted into chains
+            first, so the sweep steps from junction to junction and the chains are
+            only expanded into wires for the rows.
+            Rows are yielded in order of their start, PDC by PDC in sorted PDC order
+            with each loop row among them by its head, as each PDC is traced, so
+            they can be saved while later PDCs are still being traced. The graph
+            must not change until the rows are all taken.
+            The rules are folded down the same sweep, and the entry of each rule
+            follows the splices.
             output format:
             (startComponent|startPin, endComponent|endPin, min_csa, wire1, wire2, ..., wire_n,
-            splice1, splice2, etc)
+            splice1, splice2, etc, rule1, rule2, etc)
         """
-        output = []
-        # gather all the pdcs into a list
-        pdcs = [x for x, y in self._g.nodes(data=True) if y['fuse_rating'] >= 0]
-        # start the path at the first PDC, and initialize the dictionary
-        for pdc in pdcs:
-            path = {}
-            path['start'] = pdc
-            path['min_csa'] = math.inf
-            path['wires'] = set()
-            path['splice'] = set()
-            loop_wires = set()
-            loop = self.reportCycle(pdc)
-            # when there's a loop, temporarily modify the
-            # wire set to avoid tracing the same wires twice
-            if loop:
-                output.append(loop[0])
-                path['wires'].update(loop[1])
-                loop_wires.update(loop[1])
-            search = dict(nx.bfs_successors(self._g, source=pdc))
-            if bool(search):
-                for start, ends in search.items():
-                    # each wire, update the minimum CSA and add to
-                    # the wires list
-                    for end in ends:
-                        curr_csa = self._g[start][end]['csa']
-                        wname = self._g[start][end]['wire']
-                        if wname not in path['wires']:
-                            path['wires'].add(wname)
-                            if curr_csa < path['min_csa']:
-                                path['min_csa'] = curr_csa
-                            # when the wire is not in the list of traversed nodes,
-                            # it's an endpoint or a loop
-                            if end not in set(search.keys()):
-                                path['end'] = end
-                                if start[0] == 'S':
-                                    path['splice'].add(start)
-
-                                splice_list = list(path['splice'])
-
-                                # remove potential loop wires from the path wire set
-                                # before adding to output
-                                wire_set = path['wires'].difference(loop_wires)
-                                output.append((path['start'], path['end'], path['min_csa'],
-                                              ', '.join(wire_set), ', '.join(splice_list)))
-
-        return sorted(output, key=lambda y: y[0])
+        for record in self.traceRecords(keep):
+            yield joinRecord(record)
+
+    def traceRecords(self, keep=True):
+        """
+            keep: as in traceWires
+            Yields the same traces as traceWires, in the same order, as records of
+            [start, end, min_csa, wire names, splice names, rule entries] with the
+            wires and splices still in lists. The results are held as ComponentTrace arrays,
+            and each record is only built as it is taken
+        """
+        names = self._compactView().names
+        components = self._splitComponents()
+        remaining = [len(x) for x in components]
+        pdcs = [x for pdcs in components for x in pdcs]
+        # the loops are found first, so their rows can go in among the pdc rows
+        loops = []
+        for index in range(len(components)):
+            if not self._loop_free[index]:
+                trace = self._analyseComponent(index)
+                loops.extend(trace.loopRecord(x) for x in range(len(trace.loops)))
+        loops.sort(key=lambda x: x[0])
+        taken = 0
+        # the trace of each component being yielded, so its key of every pdc
+        # name isn't hashed again for each of its pdcs
+        traces = {}
+        # only the pdc names are sorted, the rows of each pdc are already in order
+        for pdc in sorted(pdcs, key=names.__getitem__):
+            while taken < len(loops) and loops[taken][0] <= names[pdc]:
+                yield loops[taken]
+                taken += 1
+            index = self._component_of[pdc]
+            if index not in traces:
+                traces[index] = self._analyseComponent(index)
+            yield from self._tracePdc(traces[index], pdc).records()
+            if not keep:
+                del traces[index].trees[names[pdc]]
+            remaining[index] -= 1
+            if remaining[index] == 0:
+                del traces[index]
+                if not keep:
+                    del self._analysis[self._keys[index]]
+        yield from loops[taken:]
+
+    def unfedRows(self):
+        """
+            Finds the nodes and wires no pdc feeds, and the splices with only one
+            wire. Reuses the flood out of every pdc at once that splits the graph
+            into components, so each node and wire is looked at once, however many
+            pdcs there are.
+            Returns a list of [issue, component|pin, wire, other end] rows: an
+            "Unfed component" row for each node no pdc reaches, an "Unfed wire" row
+            for each wire between such nodes, listed from one of its ends, and a
+            "Dangling splice" row for each splice with one wire, with that wire
+        """
+        chains = self._chainView()
+        self._splitComponents()
+        graph = chains.graph
+        names, ids, wire = graph.names, graph.ids, graph.wire
+        indptr, indices, edge_ids = graph.indptr, graph.indices, graph.edge_ids
+        component_of, chain_of, chain_u = self._component_of, chains.chain_of, chains.chain_u
+        components = []
+        wires = []
+        dangling = []
+        for node, name in enumerate(names):
+            if ids.get(name) != node:
+                # removed from the graph, its id is only kept for reuse
+                continue
+            start, stop = indptr[node], indptr[node + 1]
+            # inner nodes of a chain are fed if its junctions are
+            junction = node if chain_of[node] < 0 else chain_u[chain_of[node]]
+            if component_of[junction] < 0:
+                components.append(["Unfed component", name, None, None])
+                for k in range(start, stop):
+                    if indices[k] >= node:
+                        wires.append(["Unfed wire", name, str(wire[edge_ids[k]]),
+                                      names[indices[k]]])
+            if name[:1] == 'S' and stop - start == 1:
+                dangling.append(["Dangling splice", name, str(wire[edge_ids[start]]),
+                                 names[indices[start]]])
+        counts = [str(len(components)) + " unfed components", str(len(wires)) + " unfed wires",
+                  str(len(dangling)) + " dangling splices"]
+        self.gui.reportError("found " + ", ".join(counts), "log")
+        return components + wires + dangling
+
+    def _sweep(self, pdc):
+        """
+            pdc: node id to start the sweep from
+            Sweep of the junctions of the component holding pdc, nearest first by
+            the number of wires along the chains, and ties go to the one queued
+            first. Fills in _parent, _link and _dist for each junction reached, and returns
+            the junction ids in visiting order, the pdc first
+        """
+        chains = self._chainView()
+        indptr, indices, edge_ids = chains.indptr, chains.indices, chains.edge_ids
+        wire_start = chains.wire_start
+        parent, link, dist, seen = self._parent, self._link, self._dist, self._seen
+        parent[pdc] = -1
+        link[pdc] = -1
+        dist[pdc] = 0
+        seen[pdc] = 1
+        queue = [(0, 0, pdc, pdc, -1)]
+        # queued entries count up, so entries of the same reach leave in the order queued
+        queued = 1
+        order = []
+        while queue:
+            reach, _, node, via, chain = heapq.heappop(queue)
+            if node != via:
+                if seen[node]:
+                    continue
+                seen[node] = 1
+                parent[node] = via
+                link[node] = chain
+                dist[node] = reach
+            order.append(node)
+            for k in range(indptr[node], indptr[node + 1]):
+                end = indices[k]
+                if not seen[end]:
+                    chain = edge_ids[k]
+                    length = wire_start[chain + 1] - wire_start[chain]
+                    heapq.heappush(queue, (reach + length, queued, end, node, chain))
+                    queued += 1
+        for node in order:
+            seen[node] = 0
+        return order
 
     def printTraverse(self):
         '''
@@ -237,13 +929,10 @@ class GraphManager:
 
     def printPdcNodes(self):
         '''
-            Prints the DFS of every PDC node in the graph
+            Prints the junctions the sweep reaches from every PDC node in the graph
             Test helper function. remove on release
         '''
-        pdcs = [x for x, y in self._g.nodes(data=True) if y['fuse_rating'] >= 0]
-        pdcs.sort()
-        try:
-            for node in pdcs:
-                print(node, ':', dict(nx.bfs_successors(self._g, node)))
-        except nx.exception.NetworkXNoCycle:
-            print('no cycles')
+        names = self._compactView().names
+        for pdcs in self._splitComponents():
+            for pdc in pdcs:
+                print(names[pdc], ':', [names[x] for x in self._sweep(pdc)])
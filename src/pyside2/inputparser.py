@@ -1,6 +1,54 @@
 import csv
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from os.path import basename
 from report import Report
+from messagelog import MessageLog
+from workbooksession import WorkbookSession, fileStat
+
+
+def parseReport(job, cache):
+    """
+        job: (filename, from_labels, to_labels, csa, desc) arguments of one report
+        cache: ReportCache shared with the parser, or None
+        Reads one report in a worker process. The returned Report holds a MessageLog
+        in place of the gui, with the messages reported while reading it
+    """
+    return Report(*job, MessageLog(), cache)
+
+
+def loadReport(filename):
+    """
+        filename: full file path of report file
+        Reads every row of a report in a worker process, before its columns are
+        picked, and returns the WorkbookSession holding the rows
+    """
+    session = WorkbookSession(filename)
+    session.loadRows()
+    return session
+
+
+def prefetchFile(filename):
+    """
+        filename: full file path of a report (.xlsx) or fuse map (.csv)
+        Loads the file in a worker process. returns the fileStat of the file from
+        before it was read, and the WorkbookSession of a report or the rows of a
+        fuse map, so a file saved again since can be told apart
+    """
+    stat = fileStat(filename)
+    if filename.lower().endswith('.csv'):
+        return stat, loadPDC(filename)
+    return stat, loadReport(filename)
+
+
+def loadPDC(filename):
+    """
+        filename: full file path of pdc file
+        Reads the rows of a PDC fuse map in a worker process and returns them
+        as a list of dicts keyed by the header
+    """
+    with open(filename, mode='rt') as csv_file:
+        return list(csv.DictReader(csv_file, delimiter=','))
 
 
 class InputParser:
@@ -9,19 +57,40 @@ class InputParser:
        Fields:
         reports: a list of previously parsed report Objects
         pdcs: a dict of previously parsed PDC map lists, with filename keys
+        cache: ReportCache of parsed report tables kept between runs, or None
+        sessions: dict of open WorkbookSessions of reports not yet read, with filename keys
+        prefetched: dict of futures for reports and fuse maps being loaded in the
+            background, with filename keys, each from prefetchFile
        Methods:
+        prefetch(filenames)
+            starts loading the rows of reports and fuse maps in the background
+            as soon as they are picked, so reading them later only has to
+            pick out the columns
+        dropPrefetch(filename)
+            forgets the background load of a file that is no longer picked
+        close()
+            stops the worker pool and closes open reports
+        openSession(filename)
+            opens the report at filename, or returns its open session, so
+            the column picker and readReport share one open workbook
         readPDC(filename)
             reads the pdc file specified at filename and inserts it into pdcs
             filename must be unique to other pdc files
         readReport(filename, from_labels, to_labels, csa, desc)
             reads the report specified at filename with the
             column labels
+        readReports(jobs)
+            reads several reports at once in a pool of worker processes
     """
 
-    def __init__(self, gui):
+    def __init__(self, gui, cache=None):
         self._reports = []
         self._pdcs = {}
+        self._pool = None
+        self._sessions = {}
+        self._prefetched = {}
         self.gui = gui
+        self.cache = cache
 
     def getReports(self):
         """
@@ -35,8 +104,124 @@ class InputParser:
         """
         self._reports.clear()
         self._pdcs.clear()
+        self.closeSessions()
+        for filename in list(self._prefetched):
+            self.dropPrefetch(filename)
         print("cleared parser data")
 
+    def _getPool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor()
+        return self._pool
+
+    def prefetch(self, filenames):
+        """
+            filenames: full file paths of picked wire reports (.xlsx) and fuse maps (.csv)
+            Starts loading each file in the worker pool. Reports are decompressed
+            and read into a raw row table and fuse maps into their rows, while
+            the user is still picking columns. Files already loading are skipped
+        """
+        for filename in filenames:
+            if filename in self._prefetched:
+                continue
+            try:
+                self._prefetched[filename] = self._getPool().submit(prefetchFile, filename)
+            except BrokenProcessPool:
+                # reading falls back to the file when the pool is gone
+                self._pool = None
+                return
+
+    def dropPrefetch(self, filename):
+        """
+            filename: full file path of a picked file
+            cancels or discards the background load of filename
+        """
+        future = self._prefetched.pop(filename, None)
+        if future is not None:
+            future.cancel()
+
+    def _takePrefetched(self, filename):
+        """
+            filename: full file path of a picked file
+            waits for the background load of filename and returns its result,
+            or None if it wasn't prefetched, failed, or the file was saved again
+            since it was loaded, in which case the caller reads the file itself
+        """
+        future = self._prefetched.pop(filename, None)
+        if future is None or future.cancelled() or future.exception() is not None:
+            return None
+        return self._currentResult(filename, future)
+
+    @staticmethod
+    def _currentResult(filename, future):
+        """
+            filename: full file path of a prefetched file
+            future: finished future of prefetchFile
+            returns the loaded result, or None if the file has changed since it
+            was loaded, so its rows aren't read or cached under the new contents
+        """
+        stat, result = future.result()
+        try:
+            if fileStat(filename) != stat:
+                return None
+        except OSError:
+            return None
+        return result
+
+    def openSession(self, filename):
+        """
+            filename: full file path of report file
+            returns the WorkbookSession of the report with its header read, opening
+            it if needed. The workbook is closed again once the header is read, so
+            the file isn't held open while the columns are picked. The session is
+            handed to the report by readReport, which reads it again if the file
+            was saved since. A report whose background load has finished uses the
+            loaded rows instead
+        """
+        session = self._sessions.get(filename)
+        if session is not None and not session.isCurrent():
+            self._closeSession(filename)
+            session = None
+        if session is None:
+            future = self._prefetched.get(filename)
+            if future is not None and future.done() and future.exception() is None:
+                loaded = self._currentResult(filename, future)
+                if loaded is not None:
+                    return loaded
+            session = WorkbookSession(filename)
+            try:
+                session.readHeader()
+            finally:
+                session.close()
+            self._sessions[filename] = session
+        return session
+
+    def _closeSession(self, filename):
+        session = self._sessions.pop(filename, None)
+        if session is not None:
+            session.close()
+
+    def closeSessions(self):
+        """
+            closes every session not yet handed to a report
+        """
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
+
+    def close(self):
+        """
+            drops background loads, closes open sessions, and shuts down the
+            worker pool. The parser can still be used afterwards, and starts
+            a new pool when it needs one
+        """
+        for filename in list(self._prefetched):
+            self.dropPrefetch(filename)
+        self.closeSessions()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
     def getPDCs(self):
         """
             getter for pdc list
@@ -52,31 +237,32 @@ class InputParser:
         """
         try:
             contents_list = []
-            with open(filename, mode='rt') as csv_file:
-                pdc_dict = csv.DictReader(csv_file, delimiter=',')
-                name = basename(filename)
-                for i, line in enumerate(pdc_dict):
-                    contents = {}
-                    if line["CONNECTOR"] and line["PIN"]:
-                        contents["CONNECTOR"] = (line["CONNECTOR"], line["PIN"])
-                    else:
-                        err_str = ("Missing connector or pin information "
-                                   "at line " + str(i + 2) + " in file " + str(name))
-                        self.gui.reportError(err_str, "error")
-                        return False
-                    if line["FUSE RATING"]:
-                        contents["FUSE"] = line["FUSE RATING"]
-                    else:
-                        err_str = ("Missing fuse rating value "
-                                   "at line " + str(i + 2) + " in file " + str(name))
-                        self.gui.reportError(err_str, 'error')
-                        return False
-                    contents_list.append(contents)
-                if name not in self._pdcs:
-                    self._pdcs[name] = contents_list
-                    log = "successfully read PDC map: " + str(name)
-                    self.gui.reportError(log, "log")
-                return contents_list
+            pdc_dict = self._takePrefetched(filename)
+            if pdc_dict is None:
+                pdc_dict = loadPDC(filename)
+            name = basename(filename)
+            for i, line in enumerate(pdc_dict):
+                contents = {}
+                if line["CONNECTOR"] and line["PIN"]:
+                    contents["CONNECTOR"] = (line["CONNECTOR"], line["PIN"])
+                else:
+                    err_str = ("Missing connector or pin information "
+                               "at line " + str(i + 2) + " in file " + str(name))
+                    self.gui.reportError(err_str, "error")
+                    return False
+                if line["FUSE RATING"]:
+                    contents["FUSE"] = line["FUSE RATING"]
+                else:
+                    err_str = ("Missing fuse rating value "
+                               "at line " + str(i + 2) + " in file " + str(name))
+                    self.gui.reportError(err_str, 'error')
+                    return False
+                contents_list.append(contents)
+            if name not in self._pdcs:
+                self._pdcs[name] = contents_list
+                log = "successfully read PDC map: " + str(name)
+                self.gui.reportError(log, "log")
+            return contents_list
 
         except FileNotFoundError:
             self.gui.reportError("could not find PDC file at " + str(filename), "warning")
@@ -98,6 +284,60 @@ class InputParser:
             creates and reads the report, stores the report object in
             self.reports list, and returns the data
         """
-        report = Report(filename, from_labels, to_labels, csa, desc, self.gui)
+        session = self._takePrefetched(filename)
+        if session is None:
+            session = self._sessions.pop(filename, None)
+            if session is not None and not session.isCurrent():
+                # saved again since the columns were picked, read the new file
+                session.close()
+                session = None
+        else:
+            self._closeSession(filename)
+        report = Report(filename, from_labels, to_labels, csa, desc, self.gui, self.cache,
+                        session)
         self._reports.append(report)
         return report
+
+    def readReports(self, jobs):
+        """
+            jobs: list of (filename, from_labels, to_labels, csa, desc) tuples,
+                each holding the arguments of readReport
+            Reads the reports concurrently in a pool of worker processes, so the
+            parsing of each report runs on its own core. Reports whose rows were
+            prefetched only need their columns picked, and are read here instead.
+            Reports are stored as in readReport, and their log messages are
+            passed to the gui in the order of jobs, whichever report finishes first.
+            returns the list of report objects in the order of jobs
+        """
+        if len(jobs) < 2:
+            return [self.readReport(*job) for job in jobs]
+        futures = []
+        try:
+            for job in jobs:
+                if job[0] in self._prefetched:
+                    futures.append(None)
+                    continue
+                # open files can't be handed to another process, each worker opens its own
+                self._closeSession(job[0])
+                futures.append(self._getPool().submit(parseReport, job, self.cache))
+        except BrokenProcessPool:
+            futures.extend([None] * (len(jobs) - len(futures)))
+        reports = []
+        for job, future in zip(jobs, futures):
+            report = None
+            if future is not None:
+                try:
+                    report = future.result()
+                except BrokenProcessPool:
+                    if self._pool is not None:
+                        self._pool = None
+                        self.gui.reportError("report worker stopped, reading remaining "
+                                             "reports one at a time", "warning")
+            if report is None:
+                reports.append(self.readReport(*job))
+                continue
+            report.gui.replay(self.gui)
+            report.gui = self.gui
+            self._reports.append(report)
+            reports.append(report)
+        return reports
@@ -1,16 +1,22 @@
 import sys
+from multiprocessing import freeze_support
 from pathlib import Path
 from os.path import dirname, basename
 from PySide2.QtWidgets import QWidget, QStackedWidget, QMainWindow, QGridLayout, QLabel
 from PySide2.QtWidgets import QFormLayout, QFileDialog, QComboBox, QPushButton
-from PySide2.QtWidgets import QListWidget, QScrollBar, QListWidgetItem
+from PySide2.QtWidgets import QListWidget, QScrollBar, QListView
 from PySide2.QtWidgets import QApplication, QFrame, QLineEdit, QHBoxLayout, QVBoxLayout
-from PySide2.QtGui import Qt, QColor
-from openpyxl import load_workbook
+from PySide2.QtWidgets import QProgressBar
+from PySide2.QtGui import Qt
+from PySide2.QtCore import QThread
 from inputparser import InputParser
-from export import ExportManager
+from reportcache import ReportCache
+from export import ExportManager, fileFilters, filterExtension
 from graphmanager import GraphManager
 from csvconfig import CsvConfig
+from consolemodel import ConsoleModel
+from pipeline import Pipeline
+from submitworker import SubmitWorker
 
 
 class App(QMainWindow):
@@ -19,12 +25,16 @@ class App(QMainWindow):
        Fields:
         parser: input parser object to get input from files
         graph: GraphManager instance to store data into.
-        export: ExportManager instance to handle Excel writing
+        export: ExportManager instance to handle writing the trace file
+        pipeline: Pipeline that runs Submit with parser, graph and export, keeping
+            unchanged reports in the graph between runs
+        submit_run: (QThread, SubmitWorker) of the Submit run in progress, or None
         stacked_widget: the main window container
         wire_report_paths: holds all report paths selected by user
         pdc_paths: holds all pdc filepaths selected by user
         wire_report_configs: manages saving and loading of
             column configurations
+        console_model: ConsoleModel holding the status console messages
         working_directory: the current working directory of the file pickers
        Methods:
         setupUI(): creates the UI structure and elements
@@ -38,9 +48,11 @@ class App(QMainWindow):
     # sets up UI and create parser and GraphManager instances
     def __init__(self):
         super().__init__()
-        self.parser = InputParser(self)
+        self.parser = InputParser(self, ReportCache())
         self.graph = GraphManager(self)
         self.export = ExportManager(self)
+        self.pipeline = Pipeline(self.parser, self.graph, self.export, incremental=True)
+        self.submit_run = None
         self.stacked_widget = QStackedWidget()
         self.wire_report_paths = []
         self.pdc_paths = []
@@ -48,7 +60,11 @@ class App(QMainWindow):
         self.wire_report_list = QListWidget()
         self.left_widget_layout = QFormLayout()
         self.right_widget_layout = QFormLayout()
-        self.console_widget = QListWidget()
+        self.console_model = ConsoleModel()
+        self.console_widget = QListView()
+        self.console_widget.setModel(self.console_model)
+        self.console_widget.setUniformItemSizes(True)
+        self.console_model.flushed.connect(self.console_widget.scrollToBottom)
         self.working_directory = Path.home().as_posix()
         self.setupUI()
 
@@ -65,26 +81,16 @@ class App(QMainWindow):
         returns to file picker
         """
         self.goToPage("file_picker")
-        self.console_widget.clear()
+        self.console_model.clear()
 
     def reportError(self, error_code, error_type):
         """
             error_code: string that specifies what type of error recieved
             used by other modules to report errors encountered
             error_type: string labeled "warning", "error", or "log"
+            messages are batched into the console by console_model
         """
-        item = QListWidgetItem(error_code)
-        if error_type == 'error':
-            print_color = QColor(255, 0, 0)
-        elif error_type == 'warning':
-            print_color = QColor(246, 190, 0)
-        else:
-            print_color = QColor(0, 0, 0)
-
-        item.setTextColor(print_color)
-        self.console_widget.addItem(item)
-        self.console_widget.scrollToBottom()
-        print(error_code, error_type)
+        self.console_model.append(error_code, error_type)
 
     def setupUI(self):
         """
@@ -136,9 +142,11 @@ class App(QMainWindow):
                         if self.wire_report_list.item(item).text() == basename(label.text()):
                             self.wire_report_list.takeItem(item)
                     self.wire_report_paths.remove(label.text())
+                    self.parser.dropPrefetch(label.text())
                     self.left_widget_layout.removeRow(label)
                 else:
                     self.pdc_paths.remove(label.text())
+                    self.parser.dropPrefetch(label.text())
                     self.right_widget_layout.removeRow(label)
                 if self.wire_report_paths and self.pdc_paths:
                     next_button.setEnabled(True)
@@ -173,6 +181,8 @@ class App(QMainWindow):
                 if file not in self.pdc_paths:
                     self.pdc_paths.append(file)
                     createReportLabel(file, "pdc")
+            # start reading the fuse maps while the user carries on
+            self.parser.prefetch(filenames)
             if self.wire_report_paths and self.pdc_paths:
                 next_button.setEnabled(True)
             else:
@@ -197,6 +207,8 @@ class App(QMainWindow):
                     self.wire_report_paths.append(file)
                     self.wire_report_list.addItem(basename(file))
                 self.working_directory = dirname(file)
+            # start reading the reports while the user picks columns
+            self.parser.prefetch(filenames)
             if self.wire_report_paths and self.pdc_paths:
                 next_button.setEnabled(True)
             else:
@@ -209,12 +221,11 @@ class App(QMainWindow):
                 opens file picker to choose save location
                 adds save path to GUI
             """
-            save_file, _ = QFileDialog.getSaveFileName(self,
-                                                       "Choose save location for trace file",
-                                                       Path.home().as_posix(),
-                                                       'Excel Files (*.xlsx)')
+            save_file, save_filter = QFileDialog.getSaveFileName(
+                self, "Choose save location for trace file", Path.home().as_posix(),
+                fileFilters())
             if save_file:
-                self.export.setSavePath(save_file)
+                self.export.setSavePath(save_file, filterExtension(save_filter))
                 save_label.setText("Save Path: " + self.export.getSavePath())
 
         file_picker_widgets = QWidget()
@@ -395,28 +406,75 @@ class App(QMainWindow):
 
         def sendReports():
             """
-                parses reports and pdcs
-                saves trace to export location
+                parses reports and pdcs and saves the trace to the export
+                location, on a worker thread so the window stays responsive
             """
+            if self.submit_run is not None:
+                return
 
-            # send pdc to input parser
-            for path in self.pdc_paths:
-                if path:
-                    self.parser.readPDC(path)
-
-            # parse wire reports
+            jobs = []
             for path, fields in wire_report_dict.items():
                 from_tuple = (fields[0], fields[1])
                 to_tuple = (fields[2], fields[3])
-                self.parser.readReport(path, from_tuple, to_tuple, fields[4], fields[5])
+                jobs.append((path, from_tuple, to_tuple, fields[4], fields[5]))
+
+            thread = QThread()
+            worker = SubmitWorker(self.pipeline, list(self.pdc_paths), jobs)
+            worker.moveToThread(thread)
+            # signals from the worker are queued onto the gui thread
+            worker.message.connect(self.reportError)
+            worker.progress.connect(showProgress)
+            worker.finished.connect(finishRun)
+            worker.finished.connect(thread.quit)
+            thread.started.connect(worker.run)
+            thread.finished.connect(releaseRun)
+            thread.finished.connect(worker.deleteLater)
+            thread.finished.connect(thread.deleteLater)
+            self.submit_run = (thread, worker)
+            submit.setEnabled(False)
+            back.setEnabled(False)
+            cancel.setEnabled(True)
+            progress_bar.setValue(0)
+            self.console_model.startRun()
+            thread.start()
+
+        def showProgress(done, total, stage):
+            """
+                done: number of stages finished
+                total: number of stages in the run
+                stage: name of the stage about to run
+                updates the progress bar
+            """
+            progress_bar.setMaximum(total)
+            progress_bar.setValue(done)
+            progress_bar.setFormat(stage + " (%p%)")
+
+        def finishRun(completed):
+            """
+                completed: False if the run was cancelled or failed
+                shows how the run ended once the worker is done
+            """
+            cancel.setEnabled(False)
+            if not completed:
+                progress_bar.setFormat("Stopped (%p%)")
+
+        def releaseRun():
+            """
+                drops the run and re-enables submitting once its thread has quit,
+                so the QThread isn't released while it is still running
+            """
+            self.submit_run = None
+            submit.setEnabled(True)
+            back.setEnabled(True)
 
-            for _, pdc in self.parser.getPDCs().items():
-                self.graph.addPDC(pdc)
-            for report in self.parser.getReports():
-                self.graph.addReport(report)
-            self.export.exportToExcel(self.graph.traceWires())
-            self.parser.clearParsedData()
-            self.graph.clearGraph()
+        def cancelRun():
+            """
+                stops the Submit run before its next stage
+            """
+            if self.submit_run is not None:
+                self.submit_run[1].cancel()
+                cancel.setEnabled(False)
+                self.reportError("cancelling after the current stage", "warning")
 
         # this list contains all the column fields names
         # necessary for reading the input
@@ -432,6 +490,13 @@ class App(QMainWindow):
         fields_selector = QStackedWidget()
         submit = QPushButton('Submit')
         submit.setMaximumWidth(200)
+        cancel = QPushButton('Cancel')
+        cancel.setMaximumWidth(200)
+        cancel.setEnabled(False)
+        progress_bar = QProgressBar()
+        progress_bar.setFormat("")
+        back = QPushButton("Back")
+        back.setMaximumWidth(200)
         save_label = QLabel("Save Path: " + self.export.getSavePath())
 
         # the Dictionary that contains all the wire column fields.
@@ -525,7 +590,7 @@ class App(QMainWindow):
             combo_box_list = []
             fields_container.setLayout(fields_layout)
             combo_box_dict.update({wire_report: combo_box_list})
-            column_names = readColumnNames(wire_report)
+            column_names = readColumnNames(self.parser, wire_report)
 
             for i, _ in enumerate(fields_list):
                 combo_box = QComboBox()
@@ -543,13 +608,13 @@ class App(QMainWindow):
         fields_selector.setCurrentIndex(0)
 
         # add navigation buttons to the container
-        back = QPushButton("Back")
-        back.setMaximumWidth(200)
         nav_buttons = QHBoxLayout()
         nav_buttons.addWidget(submit)
+        nav_buttons.addWidget(cancel)
         nav_buttons.addWidget(back)
         nav_buttons.addWidget(save_label)
         page_layout.addLayout(nav_buttons, 4, 0, 1, 1)
+        page_layout.addWidget(progress_bar, 5, 0, 1, 2)
 
         # console scroll box and label
         console_label = QLabel("wire validator status updates:")
@@ -563,26 +628,26 @@ class App(QMainWindow):
 
         submit.clicked.connect(makeDict)
         submit.clicked.connect(sendReports)
+        cancel.clicked.connect(cancelRun)
 
 
-def readColumnNames(filename):
+def readColumnNames(parser, filename):
     """
+        parser: InputParser that keeps the report open until it is read
         filename: full file path of report file
-        gets first full line of worksheet
+        gets the header row of the worksheet
         and returns it as a list
         helper function for UI drop down boxes
     """
     names = []
     if filename:
-        workb = load_workbook(filename, read_only=True)
-        sheet = workb.active
-        for row in sheet.iter_rows(1, sheet.max_row, 1, sheet.max_column, True):
-            if None not in row:
-                return list(row)
+        return parser.openSession(filename).readHeader()
     return names
 
 
 if __name__ == '__main__':
+    # lets the frozen Windows build start report worker processes
+    freeze_support()
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
     window = App()
@@ -0,0 +1,61 @@
+class MessageLog:
+    """
+        MessageLog: stands in for the gui where status messages can't be shown
+        directly, such as in a worker process. Messages are kept in order so
+        they can be passed on to the gui later.
+        Fields:
+            messages: list of (error_code, error_type) in the order they were reported
+        Methods:
+            reportError(error_code, error_type): records a message
+            replay(gui): reports every recorded message to gui, in order
+    """
+
+    def __init__(self):
+        self.messages = []
+
+    def reportError(self, error_code, error_type):
+        """
+            error_code: message text
+            error_type: string labeled "warning", "error", or "log"
+            records the message, with the same arguments as App.reportError
+        """
+        self.messages.append((error_code, error_type))
+
+    def replay(self, gui):
+        """
+            gui: object with a reportError method, normally the App window
+            reports every recorded message to gui in the order they were recorded
+        """
+        for error_code, error_type in self.messages:
+            gui.reportError(error_code, error_type)
+
+
+class StreamLog:
+    """
+        StreamLog: stands in for the gui when running without one, such as from
+        the command line. Messages are written to a text stream as they arrive
+        and counted by type.
+        Fields:
+            stream: text stream the messages are written to
+            quiet: when True, "log" messages are counted but not written
+            counts: dict of the number of messages of each type
+        Methods:
+            reportError(error_code, error_type): writes and counts a message
+    """
+
+    def __init__(self, stream, quiet=False):
+        self.stream = stream
+        self.quiet = quiet
+        self.counts = {}
+
+    def reportError(self, error_code, error_type):
+        """
+            error_code: message text
+            error_type: string labeled "warning", "error", or "log"
+            writes the message, with the same arguments as App.reportError
+        """
+        self.counts[error_type] = self.counts.get(error_type, 0) + 1
+        if self.quiet and error_type == "log":
+            return
+        self.stream.write(error_type + ": " + str(error_code) + "\n")
+        self.stream.flush()
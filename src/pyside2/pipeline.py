@@ -0,0 +1,188 @@
+import os
+from reportcache import reportKey
+
+
+class Pipeline:
+    """
+        Pipeline: the Submit run, from reading the inputs to saving the trace
+        Holds no Qt objects, so it can run on a worker thread. Between stages it
+        reports progress and checks whether the run was cancelled. The parser,
+        graph, and exporter report their messages to the given gui for the
+        length of the run.
+        In incremental mode the parsed reports and the graph are kept after a run.
+        The next run only reads the reports whose contents or columns changed,
+        swaps their wires in the graph, and retraces the components they touch.
+        A change to the fuse maps rebuilds the graph from the kept reports.
+        Changed reports are added after the unchanged ones, so where reports share
+        a wire or paths tie, the trace matches a full run with them listed last.
+        Fields:
+            parser: InputParser reading the fuse maps and reports
+            graph: GraphManager the inputs are added to
+            export: ExportManager saving the trace
+            stages: list of (name, method) run in order
+            incremental: keep the parsed inputs and graph between runs
+            inputs: in incremental mode, (stat, key, job, report) of each report in
+                the graph, with filename keys
+            pdc_keys: in incremental mode, (stat, key) of each fuse map in the graph
+        Methods:
+            run(pdc_paths, jobs, gui, progress, cancelled): runs every stage,
+                returns False if cancelled
+            reset(): forgets the kept inputs and clears the graph
+    """
+
+    def __init__(self, parser, graph, export, incremental=False):
+        self.parser = parser
+        self.graph = graph
+        self.export = export
+        self.incremental = incremental
+        self.stages = [("Reading fuse maps", self._readPDCs),
+                       ("Reading wire reports", self._readReports),
+                       ("Building graph", self._buildGraph),
+                       ("Tracing and saving", self._save)]
+        self.inputs = {}
+        self.pdc_keys = {}
+        self._pdc_paths = []
+        self._jobs = []
+        self._changed = {}
+        self._pdc_changed = True
+
+    def run(self, pdc_paths, jobs, gui, progress=None, cancelled=None):
+        """
+            pdc_paths: full file paths of the PDC fuse maps
+            jobs: list of (filename, from_labels, to_labels, csa, desc) tuples,
+                each holding the arguments of InputParser.readReport
+            gui: object with a reportError method that messages go to during the run
+            progress: called as progress(done, total, stage name) before each
+                stage and once all stages are done, or None
+            cancelled: called between stages, the run stops when it returns True,
+                or None
+            runs the pipeline, then clears the parsed data and graph unless in
+            incremental mode. returns True when every stage ran, False if the
+            run was cancelled
+        """
+        self._pdc_paths = [x for x in pdc_paths if x]
+        self._jobs = jobs
+        owners = (self.parser, self.graph, self.export)
+        previous = [x.gui for x in owners]
+        for owner in owners:
+            owner.gui = gui
+        completed = False
+        try:
+            for done, (name, stage) in enumerate(self.stages):
+                if cancelled is not None and cancelled():
+                    gui.reportError("run cancelled before: " + name.lower(), "warning")
+                    return False
+                if progress is not None:
+                    progress(done, len(self.stages), name)
+                stage()
+            if progress is not None:
+                progress(len(self.stages), len(self.stages), "Done")
+            completed = True
+            return True
+        finally:
+            self._changed = {}
+            self.parser.clearParsedData()
+            if not self.incremental:
+                self.graph.clearGraph()
+            elif not completed:
+                # the graph may hold part of the run, start over next time
+                self.reset()
+            for owner, owner_gui in zip(owners, previous):
+                owner.gui = owner_gui
+
+    def reset(self):
+        """
+            forgets the reports and fuse maps kept by incremental mode and clears the graph
+        """
+        self.inputs = {}
+        self.pdc_keys = {}
+        self._pdc_changed = True
+        self.graph.clearGraph()
+
+    @staticmethod
+    def _fingerprint(filename, mapping, previous):
+        """
+            filename: path of an input file
+            mapping: columns the file is read with, or None for fuse maps
+            previous: (stat, key) from the last run, or None
+            returns (stat, key) of the file, where key changes with its contents
+            and mapping. The file is only hashed when its size or time changed
+        """
+        info = os.stat(filename)
+        stat = (info.st_size, info.st_mtime_ns)
+        if previous is not None and previous[0] == stat:
+            return previous
+        return stat, reportKey(filename, mapping or ((), (), None, None))
+
+    def _readPDCs(self):
+        if self.incremental:
+            keys = {}
+            for path in self._pdc_paths:
+                try:
+                    keys[path] = self._fingerprint(path, None, self.pdc_keys.get(path))
+                except OSError:
+                    keys[path] = None
+            self._pdc_changed = not self.inputs or keys != self.pdc_keys
+            self.pdc_keys = keys
+        for path in self._pdc_paths:
+            self.parser.readPDC(path)
+
+    def _readReports(self):
+        if not self.incremental:
+            self.parser.readReports(self._jobs)
+            return
+        # only reports that are new or changed since the last run are read
+        changed = []
+        for job in self._jobs:
+            kept = self.inputs.get(job[0])
+            try:
+                stat, key = self._fingerprint(job[0], job[1:], kept[:2] if kept else None)
+            except OSError:
+                stat, key = None, None
+            if kept is None or key is None or kept[1] != key:
+                changed.append((job, stat, key))
+        reports = self.parser.readReports([x[0] for x in changed])
+        self._changed = {job[0]: (stat, key, job, report)
+                         for (job, stat, key), report in zip(changed, reports)}
+        log = "read " + str(len(changed)) + " of " + str(len(self._jobs)) + " reports"
+        self.parser.gui.reportError(log + ", the rest are unchanged", "log")
+
+    def _buildGraph(self):
+        if not self.incremental:
+            for _, pdc in self.parser.getPDCs().items():
+                self.graph.addPDC(pdc)
+            for report in self.parser.getReports():
+                self.graph.addReport(report)
+            return
+        filenames = [job[0] for job in self._jobs]
+        if self._pdc_changed:
+            # fuse ratings can't be taken back out, so build the graph again
+            self.graph.clearGraph()
+            for _, pdc in self.parser.getPDCs().items():
+                self.graph.addPDC(pdc)
+            inputs = {}
+            for filename in filenames:
+                inputs[filename] = self._changed.get(filename) or self.inputs[filename]
+                self.graph.addReport(inputs[filename][3])
+            self.inputs = inputs
+            self._pdc_changed = False
+            return
+        for filename in list(self.inputs):
+            if filename not in filenames:
+                self.graph.removeReport(self.inputs.pop(filename)[3])
+        for filename in filenames:
+            if filename not in self._changed:
+                continue
+            if filename in self.inputs:
+                self.graph.replaceReport(self.inputs[filename][3], self._changed[filename][3])
+            else:
+                self.graph.addReport(self._changed[filename][3])
+            self.inputs[filename] = self._changed[filename]
+
+    def _save(self):
+        # each row is saved as it is traced, and the rows are only kept in the
+        # graph for the next run in incremental mode. The unfed rows come from
+        # the same component split the trace uses
+        unfed = self.graph.unfedRows()
+        self.export.exportTrace(self.graph.traceRecords(self.incremental), unfed,
+                                self.graph.rules)
@@ -1,5 +1,9 @@
 import os
-from openpyxl import load_workbook
+import zipfile
+from openpyxl.utils.exceptions import InvalidFileException
+from wiretable import WireTable
+from workbooksession import WorkbookSession
+from xlsxreader import XlsxFormatError
 
 
 class Report:
@@ -12,61 +16,104 @@ class Report:
        filename: the name of the original file
        toLabels: a tuple of strings containing the column labels of TO (component, pin)
        fromLabels: a tuple of strings containing the column labels of FROM (component, pin)
-       sheet_list: a list output of the report contents in
-        {FROM: (component, pin), TO: (component, pin) CSA:int, DESC:str} dictionary format
-        read(): reads the report stored in filepath and adds it to sheet_list
+       table: WireTable holding the report contents, one row per wire
+       cache: ReportCache to reuse tables parsed by earlier runs, or None
+       session: WorkbookSession the report was already opened with, or None to open
+        one. The session is closed once the report is read
+        read(): reads the report stored in filepath and adds it to table
     """
 
-    def __init__(self, filepath, from_labels, to_labels, csa, desc, gui):
+    def __init__(self, filepath, from_labels, to_labels, csa, desc, gui, cache=None,
+                 session=None):
         self.filepath = filepath
         self.filename = os.path.basename(filepath)
         self.to_labels = to_labels
         self.from_labels = from_labels
         self.csa = csa
         self.desc = desc
-        self.sheet_list = []
+        self.table = WireTable()
         self.gui = gui
+        self.cache = cache
+        self.session = session
         self.read()
 
     def getContents(self):
         """
-            getter for sheet_list
+            getter for table
         """
-        return self.sheet_list
+        return self.table
 
     def read(self):
         """
-            reads the report from filepath and stores output in sheet_list, or empty list if
+            reads the report from filepath and stores output in table, or an empty table if
             reading unsuccessful
+            When a cache is set and holds the report read with the same columns,
+            the cached table is used and the workbook is not read
         """
+        columns = (self.from_labels[0], self.from_labels[1], self.to_labels[0],
+                   self.to_labels[1], self.csa, self.desc)
         try:
-            workb = load_workbook(self.filepath, read_only=True)
-            sheet = workb.active
-            # creates a list of NoneType to check for empty rows
-            empty = [None] * sheet.max_column
+            key = None
+            if self.cache is not None:
+                key = self.cache.key(self.filepath,
+                                     (self.from_labels, self.to_labels, self.csa, self.desc))
+                cached = self.cache.get(key)
+                if cached is not None:
+                    self.table = cached
+                    log = "successfully read report: " + str(self.filename) + " (cached)"
+                    print(log)
+                    self.gui.reportError(log, "log")
+                    return self.table
             try:
-                for row in sheet.iter_rows(2, sheet.max_row, values_only=True):
-                    row_dict = {}
-                    row_list = list(row)
-                    # if row is empty, don't process it
-                    if row_list != empty:
-                        row_dict["FROM"] = (row[self.from_labels[0]],
-                                            row[self.from_labels[1]])
-                        row_dict["TO"] = (row[self.to_labels[0]],
-                                          row[self.to_labels[1]])
-                        row_dict["CSA"] = row[self.csa]
-                        row_dict["DESC"] = row[self.desc]
-                        self.sheet_list.append(row_dict)
+                if self.session is None:
+                    self.session = WorkbookSession(self.filepath)
+                try:
+                    self.table = self._readTable(columns)
+                except XlsxFormatError:
+                    self.session.useOpenpyxl()
+                    self.table = self._readTable(columns)
+                if key is not None:
+                    self.cache.put(key, self.table)
                 log = "successfully read report: " + str(self.filename)
                 print(log)
                 self.gui.reportError(log, "log")
-                return self.sheet_list
-            except KeyError as error:
+                return self.table
+            except (KeyError, IndexError) as error:
                 log = "check column number " + str(error) + " is correct"
                 print(log)
                 self.gui.reportError(log, "error")
-                return []
+                self.table = WireTable()
+                return self.table
+            except (zipfile.BadZipFile, InvalidFileException, XlsxFormatError) as error:
+                log = "could not read " + str(self.filename) + " as a workbook: " + str(error)
+                print(log)
+                self.gui.reportError(log, "error")
+                self.table = WireTable()
+                return self.table
         except FileNotFoundError:
-            log = "Could not find a file at" + str(self.filepath)
+            log = "Could not find a file at " + str(self.filepath)
+            print(log, "error")
+            self.gui.reportError(log, "error")
+            return self.table
+        except OSError as error:
+            log = "Could not open " + str(self.filepath) + ": " + str(error.strerror)
             print(log, "error")
-            return []
+            self.gui.reportError(log, "error")
+            return self.table
+        finally:
+            if self.session is not None:
+                self.session.close()
+                self.session = None
+
+    def _readTable(self, columns):
+        """
+            columns: column indexes of from component, from pin, to component,
+                to pin, csa, and description
+            reads the mapped columns of the rows below the header and returns the table
+        """
+        table = WireTable()
+        for row in self.session.rows(columns):
+            # if row is empty, don't process it
+            if row.count(None) != len(row):
+                table.append(*row)
+        return table
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+# bump when the cached WireTable layout changes so old entries are never loaded
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(Path.home().as_posix(), ".wire_validation_tool", "report_cache")
+
+
+def reportKey(filepath, mapping):
+    """
+        filepath: path of the report file
+        mapping: (from_labels, to_labels, csa, desc) columns the report is read with
+        returns a hash of the file contents together with mapping, which changes
+        whenever the report would read differently
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as file:
+        for chunk in iter(lambda: file.read(2 ** 20), b''):
+            digest.update(chunk)
+    from_labels, to_labels, csa, desc = mapping
+    columns = (CACHE_VERSION, tuple(from_labels), tuple(to_labels), csa, desc)
+    digest.update(repr(columns).encode())
+    return digest.hexdigest()
+
+
+class ReportCache:
+    """
+        ReportCache: on-disk cache of parsed wire reports
+        Each entry is a pickled WireTable, keyed by a hash of the report file contents
+        together with the column mapping it was read with, so editing the file or
+        picking different columns reads the report again. Reading an entry marks it
+        as recently used, and the least recently used entries are removed once the
+        cache grows past max_bytes.
+        Fields:
+            directory: folder holding the cache entries
+            max_bytes: size cap for all entries together
+        Methods:
+            key(filepath, mapping): returns the cache key of a report and column mapping
+            get(key): returns the cached WireTable, or None
+            put(key, table): stores a WireTable and evicts old entries
+            clear(): removes every entry
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=512 * 2 ** 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, filepath, mapping):
+        """
+            filepath: path of the report file
+            mapping: (from_labels, to_labels, csa, desc) columns the report is read with
+            returns the cache key for reading filepath with mapping
+        """
+        return reportKey(filepath, mapping)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".pickle")
+
+    def get(self, key):
+        """
+            key: cache key from key()
+            returns the cached WireTable and marks it as recently used,
+            or None if there is no usable entry
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                table = pickle.load(file)
+            os.utime(path)
+            return table
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, AttributeError, pickle.UnpicklingError):
+            # unreadable entry, drop it and read the report again
+            self._remove(path)
+            return None
+
+    def put(self, key, table):
+        """
+            key: cache key from key()
+            table: WireTable read with the key's file and column mapping
+            stores the table, then evicts the least recently used entries
+            until the cache fits in max_bytes. returns False if the cache
+            folder can't be written
+        """
+        path = self._path(key)
+        temp = path + "." + str(os.getpid()) + ".tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp, 'wb') as file:
+                pickle.dump(table, file, pickle.HIGHEST_PROTOCOL)
+            # readers in other processes only ever see a complete entry
+            os.replace(temp, path)
+        except OSError:
+            self._remove(temp)
+            return False
+        self._evict()
+        return True
+
+    def clear(self):
+        """
+            removes every entry from the cache
+        """
+        for entry in self._entries():
+            self._remove(entry.path)
+
+    def _entries(self):
+        try:
+            return [x for x in os.scandir(self.directory) if x.name.endswith(".pickle")]
+        except OSError:
+            return []
+
+    def _evict(self):
+        entries = []
+        for entry in self._entries():
+            try:
+                entries.append((entry.stat().st_mtime, entry.stat().st_size, entry.path))
+            except OSError:
+                continue
+        total = sum(x[1] for x in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,124 @@
+from bisect import bisect_right
+import math
+
+
+class Rule:
+    """
+        Rule: a validation check run in the trace sweep, with a column in the export
+        A rule folds a value down each path of the sweep tree, from a pdc through
+        its wires and nodes, and turns the value at the end of each trace row into
+        the row's entry in the rule's column. The values are folded as the sweep
+        adds each node, and a node's value is shared by every row below it, so a
+        rule adds no walk of the graph of its own. Only the callbacks a rule
+        overrides are called.
+        Fields:
+            name: header of the rule's column
+            field: name of the rule's column in JSON Lines, Parquet, and Arrow files
+            kind: type of the column entries, one of 'string', 'float', 'int', 'bool'
+        Methods:
+            start(pdc, fuse_rating): value at a pdc
+            edge(value, wire, csa): value after a wire
+            node(value, name): value after reaching a node
+            path(value, record): entry of a trace row in the rule's column
+    """
+    name = "Rule"
+    field = "rule"
+    kind = 'string'
+
+    def start(self, pdc, fuse_rating):
+        """
+            pdc: name of the pdc a path starts from
+            fuse_rating: fuse rating of the pdc
+            returns the value at the pdc
+        """
+        return None
+
+    def edge(self, value, wire, csa):
+        """
+            value: value before the wire
+            wire: wire name
+            csa: CSA of the wire, NaN when the report value is not a number
+            returns the value after the wire
+        """
+        return value
+
+    def node(self, value, name):
+        """
+            value: value on reaching the node
+            name: node name
+            returns the value after the node. Called for each node after the pdc
+        """
+        return value
+
+    def path(self, value, record):
+        """
+            value: value at the end of the row
+            record: trace record of the row, [start, end, min_csa, wire names,
+                splice names]
+            returns the row's entry in the rule's column, None leaves it empty
+        """
+        return value
+
+
+class MinCsaRule(Rule):
+    """
+        MinCsaRule: the Minimum Wire CSA Check
+        Fails a row with a wire thinner than the minimum CSA, and leaves the entry
+        empty when no wire on the row has a CSA that is a number
+        Fields:
+            minimum: smallest CSA in mm² a wire may have
+    """
+    name = "Min CSA"
+    field = "min_csa_check"
+
+    def __init__(self, minimum):
+        self.minimum = minimum
+
+    def start(self, pdc, fuse_rating):
+        return math.inf
+
+    def edge(self, value, wire, csa):
+        # NaN never compares lower, so CSAs that aren't numbers are left out
+        return csa if csa < value else value
+
+    def path(self, value, record):
+        if value == math.inf:
+            return None
+        return "PASS" if value >= self.minimum else "FAIL"
+
+
+class OverheatRule(Rule):
+    """
+        OverheatRule: the Wire Overheating Check
+        Fails a row whose thinnest wire is too thin for the fuse rating of its
+        pdc, so the wire could overheat before the fuse blows
+        Fields:
+            limits: (CSA, largest fuse rating) pairs in order of CSA. A wire is
+                taken at the largest CSA in the limits it reaches
+    """
+    name = "Overheat"
+    field = "overheat"
+
+    def __init__(self, limits):
+        self.limits = limits
+        self._sizes = [x[0] for x in limits]
+
+    def start(self, pdc, fuse_rating):
+        return fuse_rating, math.inf
+
+    def edge(self, value, wire, csa):
+        return (value[0], csa) if csa < value[1] else value
+
+    def fuseLimit(self, csa):
+        """
+            returns the largest fuse rating a wire of the CSA may have, 0 when it
+            is thinner than every CSA in limits
+        """
+        index = bisect_right(self._sizes, csa)
+        return self.limits[index - 1][1] if index else 0
+
+    def path(self, value, record):
+        fuse_rating, csa = value
+        if csa == math.inf:
+            return None
+        return "FAIL" if fuse_rating > self.fuseLimit(csa) else "PASS"
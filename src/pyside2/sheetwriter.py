@@ -0,0 +1,238 @@
+import math
+import os
+import re
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+from openpyxl.utils import get_column_letter
+
+# characters XML 1.0 can't hold, dropped from cell text
+ILLEGAL_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+# rows gathered before the sheet XML is written to the zip
+FLUSH_ROWS = 2048
+
+CONTENT_TYPES_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" '
+    'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>')
+SHEET_TYPE = (
+    '" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>')
+PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="xl/workbook.xml" Type="http://schemas.openxmlformats.org'
+    '/officeDocument/2006/relationships/officeDocument"/>'
+    '</Relationships>')
+WORKBOOK_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>')
+RELS_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">')
+SHEET_REL = (
+    '.xml" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>')
+STYLES_REL = (
+    '" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/>')
+STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/><family val="2"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>')
+SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">')
+
+
+class SheetWriter:
+    """
+        SheetWriter: streaming writer for an xlsx workbook
+        The counterpart of XlsxReader. Each row is turned into sheet XML as it is
+        appended and written to the xlsx zip in batches, so memory stays flat
+        however many rows there are, and no cell objects are built as openpyxl
+        does. Only values are written: strings as inline strings, and numbers and
+        booleans as values. None, empty strings, and numbers that aren't finite
+        leave the cell empty.
+        Rows go to the last sheet added. The workbook part listing the sheets is
+        written when the writer is closed, once every sheet is known. Leaving a
+        with block on an exception discards the workbook instead, so no half
+        written file is left behind.
+        Fields:
+            filepath: path of the workbook
+            titles: title of each sheet, in order
+            rows_written: number of rows appended to the last sheet so far
+        Methods:
+            append(row): writes a row below the last one
+            addSheet(title, widths): finishes the sheet and starts another
+            close(): finishes the sheet and closes the workbook file
+            discard(): closes the workbook file without finishing it and deletes it
+    """
+
+    def __init__(self, filepath, widths=(), title="Sheet"):
+        """
+            filepath: path of the workbook to write
+            widths: width of each column from the first, or () for the default widths
+            title: title of the first sheet, which must be a valid Excel sheet name
+        """
+        self.filepath = filepath
+        self.titles = []
+        self.rows_written = 0
+        self._letters = []
+        self._pending = []
+        self._sheet = None
+        self._zip = zipfile.ZipFile(filepath, 'w', zipfile.ZIP_DEFLATED)
+        try:
+            self._zip.writestr('_rels/.rels', PACKAGE_RELS)
+            self._zip.writestr('xl/styles.xml', STYLES)
+            self.addSheet(title, widths)
+        except BaseException:
+            self.discard()
+            raise
+
+    def addSheet(self, title, widths=()):
+        """
+            title: title of the sheet, which must be a valid Excel sheet name
+            widths: width of each column from the first, or () for the default widths
+            finishes the sheet being written and starts a new one after it, which
+            the rows appended from now on go to
+        """
+        if self._sheet is not None:
+            self._finishSheet()
+        self.titles.append(title)
+        self.rows_written = 0
+        part = 'xl/worksheets/sheet' + str(len(self.titles)) + '.xml'
+        # zip64 sizes up front, as the size of the sheet isn't known until it is finished
+        self._sheet = self._zip.open(part, 'w', force_zip64=True)
+        start = SHEET_START
+        if widths:
+            start += '<cols>'
+            for i, width in enumerate(widths, 1):
+                span = '<col min="' + str(i) + '" max="' + str(i) + '" '
+                start += span + 'width="' + str(width) + '" customWidth="1"/>'
+            start += '</cols>'
+        self._pending.append(start + '<sheetData>')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def _cell(self, ref, value):
+        """
+            ref: cell reference such as 'B12'
+            value: value to write
+            returns the XML of the cell, or '' to leave it empty
+        """
+        if value is None:
+            return ''
+        if isinstance(value, bool):
+            return '<c r="' + ref + '" t="b"><v>' + ('1' if value else '0') + '</v></c>'
+        if isinstance(value, (int, float)):
+            if isinstance(value, float) and not math.isfinite(value):
+                return ''
+            return '<c r="' + ref + '"><v>' + repr(value) + '</v></c>'
+        text = ILLEGAL_CHARS.sub('', str(value))
+        if not text:
+            return ''
+        start = '<t xml:space="preserve">' if text != text.strip() else '<t>'
+        return '<c r="' + ref + '" t="inlineStr"><is>' + start + escape(text) + '</t></is></c>'
+
+    def append(self, row):
+        """
+            row: sequence of cell values, starting from the first column
+            writes the row below the last one appended
+        """
+        self.rows_written += 1
+        number = str(self.rows_written)
+        while len(self._letters) < len(row):
+            self._letters.append(get_column_letter(len(self._letters) + 1))
+        cells = ''.join(self._cell(letter + number, value)
+                        for letter, value in zip(self._letters, row))
+        self._pending.append('<row r="' + number + '">' + cells + '</row>')
+        if len(self._pending) >= FLUSH_ROWS:
+            self._flush()
+
+    def _flush(self):
+        self._sheet.write(''.join(self._pending).encode('utf-8'))
+        self._pending = []
+
+    def _finishSheet(self):
+        self._pending.append('</sheetData></worksheet>')
+        self._flush()
+        self._sheet.close()
+        self._sheet = None
+
+    def _writeWorkbook(self):
+        """
+            writes the parts that list the sheets: the workbook, its relationships,
+            and the content types
+        """
+        numbers = [str(x) for x in range(1, len(self.titles) + 1)]
+        types = CONTENT_TYPES_START
+        workbook = WORKBOOK_START
+        rels = RELS_START
+        for number, title in zip(numbers, self.titles):
+            types += '<Override PartName="/xl/worksheets/sheet' + number + '.xml' + SHEET_TYPE
+            workbook += '<sheet name=' + quoteattr(title) + ' sheetId="' + number + '" '
+            workbook += 'r:id="rId' + number + '"/>'
+            rels += '<Relationship Id="rId' + number + '" '
+            rels += 'Target="worksheets/sheet' + number + SHEET_REL
+        styles = str(len(self.titles) + 1)
+        rels += '<Relationship Id="rId' + styles + '" Target="styles.xml' + STYLES_REL
+        self._zip.writestr('[Content_Types].xml', types + '</Types>')
+        self._zip.writestr('xl/workbook.xml', workbook + '</sheets></workbook>')
+        self._zip.writestr('xl/_rels/workbook.xml.rels', rels + '</Relationships>')
+
+    def close(self):
+        """
+            finishes the sheet and writes the workbook parts, then closes the
+            workbook file. If any of that fails the workbook is discarded and the
+            error raised
+        """
+        if self._zip is None:
+            return
+        try:
+            self._finishSheet()
+            self._writeWorkbook()
+            self._zip.close()
+        except BaseException:
+            self.discard()
+            raise
+        self._zip = None
+
+    def discard(self):
+        """
+            closes the workbook file without writing the rest of it, and deletes it
+        """
+        if self._zip is None:
+            return
+        sheet, self._sheet = self._sheet, None
+        archive, self._zip = self._zip, None
+        try:
+            try:
+                if sheet is not None:
+                    sheet.close()
+            finally:
+                archive.close()
+        except (OSError, ValueError, RuntimeError):
+            # the file is deleted anyway, and the error that stopped writing it matters more
+            pass
+        try:
+            os.remove(self.filepath)
+        except OSError:
+            pass
@@ -0,0 +1,67 @@
+from PySide2.QtCore import QObject, Signal, Slot
+
+
+class SubmitWorker(QObject):
+    """
+        SubmitWorker: runs the Submit pipeline on a QThread
+        Stands in for the gui during the run, so messages from the parser, graph,
+        and exporter are sent to the window through the message signal instead
+        of touching widgets from the worker thread.
+        Fields:
+            pipeline: Pipeline to run
+            pdc_paths: full file paths of the PDC fuse maps
+            jobs: report jobs in the format of InputParser.readReports
+        Signals:
+            message(error_code, error_type): a status message for the console
+            progress(done, total, stage): the stage about to run
+            finished(completed): the run ended, False if cancelled or failed
+        Methods:
+            run(): runs the pipeline, started by the thread
+            cancel(): stops the run before its next stage
+            reportError(error_code, error_type): sends a message to the window
+    """
+    message = Signal(str, str)
+    progress = Signal(int, int, str)
+    finished = Signal(bool)
+
+    def __init__(self, pipeline, pdc_paths, jobs):
+        super().__init__()
+        self.pipeline = pipeline
+        self.pdc_paths = pdc_paths
+        self.jobs = jobs
+        self._cancelled = False
+
+    def cancel(self):
+        """
+            asks the run to stop before its next stage. Called from the gui
+            thread, so it only sets a flag the worker checks
+        """
+        self._cancelled = True
+
+    def isCancelled(self):
+        """
+            returns True once cancel() has been called
+        """
+        return self._cancelled
+
+    def reportError(self, error_code, error_type):
+        """
+            error_code: message text
+            error_type: string labeled "warning", "error", or "log"
+            sends the message to the window through the message signal
+        """
+        self.message.emit(str(error_code), error_type)
+
+    @Slot()
+    def run(self):
+        """
+            runs the pipeline and emits finished when it ends
+        """
+        completed = False
+        try:
+            completed = self.pipeline.run(self.pdc_paths, self.jobs, self,
+                                          self.progress.emit, self.isCancelled)
+        except Exception as error:  # pylint: disable=broad-except
+            # nothing above the thread would see the error, so show it in the console
+            self.reportError("run failed: " + repr(error), "error")
+        self.finished.emit(completed)
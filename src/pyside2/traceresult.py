@@ -0,0 +1,228 @@
+import math
+from array import array
+
+
+def joinRecord(record):
+    """
+        record: trace record, [start, end, min_csa, wire names, splice names], then
+            the entry of each rule
+        returns the record as a row in the traceWires output format, with the
+        wires and splices comma separated
+    """
+    return (record[0], record[1], record[2], ', '.join(record[3]), ', '.join(record[4]),
+            *record[5:])
+
+
+class ComponentTrace:
+    """
+        ComponentTrace: trace results of one connected component
+        Holds what the pdcs of a component share: the loops found in it, each
+        reported once, and the sweep tree of each of its pdcs as it is traced.
+        Fields:
+            pdcs: names of the component's pdcs
+            loops: list of (node names, wire names, min CSA, rule values) around
+                each loop, starting from the node the loop search reached first.
+                The rule values start from the pdc with the largest fuse rating
+            loop_chains: chain ids of the loops, whose wires the endpoint rows
+                leave out
+            rules: Rules the trace is checked with
+            trees: PdcTrace of each pdc traced so far, with pdc name keys
+        Methods:
+            addLoop(nodes, wires, min_csa, values): adds a loop of the component
+            loopRecord(loop): returns the trace record of a loop
+            cycle(): returns the loop rows of the component and the wires on them
+    """
+
+    def __init__(self, pdcs, rules=()):
+        """
+            pdcs: names of the component's pdcs
+            rules: Rules to check the trace with
+        """
+        self.pdcs = pdcs
+        self.loops = []
+        self.loop_chains = set()
+        self.rules = rules
+        self.trees = {}
+
+    def addLoop(self, nodes, wires, min_csa, values=()):
+        """
+            nodes: node names around the loop, starting from its head
+            wires: wire names around the loop, where wire i joins node i to the next
+            min_csa: minimum CSA of the wires around the loop
+            values: tuple of the rule values after the loop
+        """
+        self.loops.append((nodes, wires, min_csa, values))
+
+    def loopRecord(self, loop):
+        """
+            loop: position of the loop in loops
+            returns the trace record of the loop, from its head back to its head,
+            with the entry of each rule
+        """
+        nodes, wires, min_csa, values = self.loops[loop]
+        record = [nodes[0], nodes[0], min_csa, list(wires), [x for x in nodes if x[0] == 'S']]
+        if self.rules:
+            record.extend([rule.path(value, record) for rule, value in zip(self.rules, values)])
+        return record
+
+    def cycle(self):
+        """
+            returns False if the component has no loop, or a tuple of the list of
+            loop rows in the traceWires output format and the set of wire names
+            on those loops
+        """
+        if not self.loops:
+            return False
+        rows = [joinRecord(self.loopRecord(x)) for x in range(len(self.loops))]
+        return rows, {x for loop in self.loops for x in loop[1]}
+
+
+class PdcTrace:
+    """
+        PdcTrace: trace results of one pdc, held as integer arrays
+        The sweep from a pdc is a tree rooted at it, so the trace of each endpoint
+        is the path up that tree, and endpoints fed through the same wires share
+        that part of the path. The tree only holds the junctions of the
+        ChainGraph, and each one keeps the position of its parent, the wires of the
+        chain to it, and the minimum CSA from the pdc, so a row is only a node
+        position until it is taken. The wire and splice names of a row are gathered
+        from the tree, chain by chain, as the rows are taken for the export.
+        The path down to a splice is shared by every endpoint below it, so it is
+        gathered once per splice, from the path of the splice above it, and kept.
+        A row is then the path of the nearest splice above its endpoint and the few
+        wires below that splice, rather than a walk back up to the pdc.
+        Each node also keeps the values of the rules folded down to it by the sweep,
+        and the rules turn the value of a row's end into its rule entries as the
+        row is taken.
+        Fields:
+            names: node name at each position, in sweep order, from the pdc
+            parent: position of each node's parent, -1 for the pdc
+            wires: names of the wires from each node back to its parent, in order,
+                empty for the pdc
+            on_loop: 1 for each node whose chain to its parent is on a loop, as
+                endpoint traces leave those wires out
+            min_csa: minimum CSA of the wires from the pdc to each node, leaving out
+                loop wires
+            rows: array of the positions of the endpoints, in sweep order
+            rules: Rules the trace is checked with
+            values: tuple of the rule values of each node, empty without rules
+            splice_paths: (pdc name, wire names, splice names) of the path from the
+                pdc down to each splice, the splice included, with position keys.
+                Filled in as rows below the splices are taken. The names are held
+                in tuples, which the garbage collector stops tracking
+        Methods:
+            addNode(name, parent, wires, csa, on_loop, values): adds the next node of
+                the sweep
+            addEndpoint(node): adds the trace of an endpoint to the rows
+            records(): yields the trace records of the pdc
+    """
+
+    def __init__(self, rules=()):
+        """
+            rules: Rules to check the trace with
+        """
+        self.names = []
+        self.parent = array('i')
+        self.wires = []
+        self.on_loop = bytearray()
+        self.min_csa = array('d')
+        self.rows = array('i')
+        self.splice_paths = {}
+        self.rules = rules
+        self.values = []
+
+    def addNode(self, name, parent, wires, csa, on_loop, values=()):
+        """
+            name: node name
+            parent: position of the node's parent, added before it, or -1 for a pdc
+            wires: names of the wires from the node back to the parent, in order
+            csa: minimum CSA of those wires
+            on_loop: True if the wires to the parent are on a loop
+            values: tuple of the rule values at the node
+            adds the node and returns its position
+        """
+        self.values.append(values)
+        self.names.append(name)
+        self.parent.append(parent)
+        self.wires.append(wires)
+        self.on_loop.append(1 if on_loop else 0)
+        if parent < 0:
+            self.min_csa.append(math.inf)
+        elif on_loop:
+            self.min_csa.append(self.min_csa[parent])
+        else:
+            self.min_csa.append(min(self.min_csa[parent], csa))
+        return len(self.names) - 1
+
+    def addEndpoint(self, node):
+        """
+            node: position of an endpoint
+        """
+        self.rows.append(node)
+
+    def _segment(self, node):
+        """
+            node: position of a node below a pdc
+            returns the position of the nearest splice or pdc above the node, and the
+            names of the wires from the node back up to it, leaving out loop wires
+        """
+        names, parent, wires, on_loop = self.names, self.parent, self.wires, self.on_loop
+        path = []
+        while True:
+            if not on_loop[node]:
+                path.extend(wires[node])
+            node = parent[node]
+            if parent[node] < 0 or names[node][0] == 'S':
+                return node, path
+
+    def _splicePath(self, splice):
+        """
+            splice: position of a splice below a pdc
+            returns the splice_paths entry of the splice, gathering it and those of
+            the splices above it that aren't kept yet
+        """
+        splice_paths, parent = self.splice_paths, self.parent
+        pending = []
+        node = splice
+        while node not in splice_paths and parent[node] >= 0:
+            upper, path = self._segment(node)
+            pending.append((node, path))
+            node = upper
+        summary = splice_paths[node] if parent[node] >= 0 else (self.names[node], (), ())
+        for node, path in reversed(pending):
+            path.reverse()
+            summary = (summary[0], summary[1] + tuple(path), summary[2] + (self.names[node],))
+            splice_paths[node] = summary
+        return summary
+
+    def _pathRecord(self, end):
+        names, parent, wires, on_loop = self.names, self.parent, self.wires, self.on_loop
+        path = []
+        node = end
+        # only walks up to the nearest splice, the path above it is kept
+        while True:
+            if not on_loop[node]:
+                path.extend(wires[node])
+            node = parent[node]
+            if parent[node] < 0:
+                path.reverse()
+                return [names[node], names[end], self.min_csa[end], path, []]
+            if names[node][0] == 'S':
+                break
+        start, upper_wires, splices = self.splice_paths.get(node) or self._splicePath(node)
+        path.reverse()
+        return [start, names[end], self.min_csa[end], [*upper_wires, *path], list(splices)]
+
+    def records(self):
+        """
+            yields each trace record of the pdc, [start, end, min_csa, wire names,
+            splice names] and the entry of each rule, building the lists as each
+            record is taken
+        """
+        rules = self.rules
+        for end in self.rows:
+            record = self._pathRecord(end)
+            if rules:
+                values = self.values[end]
+                record.extend([rule.path(value, record) for rule, value in zip(rules, values)])
+            yield record
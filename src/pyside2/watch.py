@@ -0,0 +1,221 @@
+"""
+    Watches a folder of wire reports and saves a fresh trace each time they change.
+    run 'python3 watch.py --help' for the options
+"""
+import argparse
+import os
+import sys
+import time
+from cli import configJobs
+from csvconfig import CsvConfig
+from export import ExportManager
+from graphmanager import GraphManager
+from inputparser import InputParser
+from messagelog import StreamLog
+from pipeline import Pipeline
+from reportcache import ReportCache
+
+# name prefix of the lock files Excel keeps next to an open workbook
+LOCK_PREFIX = "~$"
+
+
+class FolderWatch:
+    """
+        FolderWatch: keeps the trace of a folder of wire reports up to date
+        Polls the folder for wire reports that are added, changed, or removed, and
+        for changes to the fuse maps. Once a change is seen it waits until no file
+        has changed for settle seconds, so a burst of saves is traced once and a
+        report still being written isn't read half way. The trace is then rerun
+        with an incremental Pipeline, which keeps the parsed reports and graph in
+        memory, so only the changed reports are read and retraced.
+        The trace is saved next to the output file first and then moved over it,
+        so the output never holds a half written workbook.
+        Fields:
+            folder: folder holding the wire reports
+            pdc_paths: full file paths of the PDC fuse maps
+            fields: column configuration row from CsvConfig.search
+            output: trace file to write, in the format of its extension
+            interval: seconds between polls of the folder
+            settle: seconds without changes before the trace is rerun
+            pipeline: incremental Pipeline kept between runs
+            log: object with a reportError method for the messages
+        Methods:
+            scan(): returns the size and time of each watched file
+            waitForChange(previous, stop): waits for the watched files to change and settle
+            runTrace(snapshot): traces the wire reports of a scan
+            serve(stop): traces the folder, then again after each change
+    """
+
+    def __init__(self, folder, pdc_paths, fields, output, log, cache=None,
+                 interval=1.0, settle=2.0):
+        self.folder = folder
+        self.pdc_paths = [os.path.abspath(x) for x in pdc_paths]
+        self.fields = fields
+        self.interval = interval
+        self.settle = settle
+        self.log = log
+        self._export = ExportManager(log)
+        self._export.setSavePath(os.path.abspath(output))
+        self.output = self._export.getSavePath()
+        root, extension = os.path.splitext(self.output)
+        self._partial = root + '.partial' + extension
+        self._export.setSavePath(self._partial)
+        self._parser = InputParser(log, cache)
+        self.pipeline = Pipeline(self._parser, GraphManager(log), self._export, incremental=True)
+
+    def close(self):
+        """
+            shuts down the report reading processes
+        """
+        self._parser.close()
+
+    def scan(self):
+        """
+            returns a dict of (size, modification time) of each wire report in the
+            folder and each fuse map, with full path keys. A fuse map that can't be
+            found maps to None
+        """
+        snapshot = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if not entry.name.lower().endswith('.xlsx') or entry.name.startswith(LOCK_PREFIX):
+                    continue
+                filepath = os.path.abspath(entry.path)
+                if filepath in (self.output, self._partial) or not entry.is_file():
+                    continue
+                try:
+                    info = entry.stat()
+                except OSError:
+                    # removed between the listing and the stat
+                    continue
+                snapshot[filepath] = (info.st_size, info.st_mtime_ns)
+        for pdc_path in self.pdc_paths:
+            try:
+                info = os.stat(pdc_path)
+                snapshot[pdc_path] = (info.st_size, info.st_mtime_ns)
+            except OSError:
+                snapshot[pdc_path] = None
+        return snapshot
+
+    def waitForChange(self, previous, stop):
+        """
+            previous: scan the last trace was run on
+            stop: called between polls, waiting ends when it returns True
+            Polls until a watched file changes, then until no file has changed
+            for settle seconds. returns the settled scan, or None if stopped
+        """
+        current = previous
+        while current == previous:
+            if stop():
+                return None
+            time.sleep(self.interval)
+            current = self.scan()
+        settled_since = time.monotonic()
+        while time.monotonic() - settled_since < self.settle:
+            if stop():
+                return None
+            time.sleep(self.interval)
+            latest = self.scan()
+            if latest != current:
+                current = latest
+                settled_since = time.monotonic()
+        return current
+
+    def runTrace(self, snapshot):
+        """
+            snapshot: scan of the files to trace, from scan()
+            traces the wire reports in the snapshot and saves the trace to output.
+            A failed run is logged as an error and the next change retries it.
+            returns True if the trace was saved
+        """
+        reports = sorted(x for x in snapshot if x not in self.pdc_paths)
+        if not reports:
+            self.log.reportError("no wire reports in " + self.folder + " yet", "warning")
+            return False
+        start = time.monotonic()
+        try:
+            self.pipeline.run(self.pdc_paths, configJobs(self.fields, reports), self.log)
+            os.replace(self._partial, self.output)
+        except OSError as error:
+            # a locked output or a report removed mid run, the next change retries
+            self.log.reportError("trace not saved: " + str(error), "error")
+            return False
+        except Exception as error:
+            # a report that can't be read or any other failure of this run. The
+            # pipeline starts over next run, so watching goes on
+            self.log.reportError("trace failed: " + type(error).__name__ + ": " + str(error),
+                                 "error")
+            return False
+        took = " in " + str(round(time.monotonic() - start, 1)) + " s"
+        self.log.reportError("traced " + str(len(reports)) + " reports to " + self.output + took,
+                             "log")
+        return True
+
+    def serve(self, stop=None):
+        """
+            stop: called between polls, serving ends when it returns True,
+                or None to serve until interrupted
+            traces the folder once, then again each time its files change and settle
+        """
+        if stop is None:
+            def stop():
+                return False
+        snapshot = self.scan()
+        self.runTrace(snapshot)
+        while True:
+            snapshot = self.waitForChange(snapshot, stop)
+            if snapshot is None:
+                return
+            self.runTrace(snapshot)
+
+
+def main(argv=None):
+    """
+        argv: command line arguments, defaults to sys.argv
+        watches the folder until interrupted and returns the exit status:
+        0 when stopped, 2 if the configuration can't be used
+    """
+    parser = argparse.ArgumentParser(description="trace a folder of wire reports on each change")
+    parser.add_argument('folder', help="folder the wire reports are saved to")
+    parser.add_argument('--pdc', nargs='+', required=True, metavar='CSV',
+                        help="PDC fuse map files")
+    parser.add_argument('--config', required=True,
+                        help="name of the saved column configuration")
+    parser.add_argument('--configs', default="configs.csv",
+                        help="configuration file saved by the gui (default configs.csv)")
+    parser.add_argument('--output', required=True,
+                        help="trace file to write, in the format of its extension")
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help="seconds between checks of the folder (default 1)")
+    parser.add_argument('--settle', type=float, default=2.0,
+                        help="seconds without changes before tracing (default 2)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="don't reuse or store parsed reports")
+    parser.add_argument('--quiet', action='store_true',
+                        help="only print warnings and errors")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    log = StreamLog(sys.stderr, args.quiet)
+    fields = CsvConfig(args.configs, log).search(args.config)
+    if not fields:
+        log.reportError("no configuration named " + args.config + " in " + args.configs,
+                        "error")
+        return 2
+    try:
+        configJobs(fields, [])
+    except ValueError as error:
+        log.reportError(str(error), "error")
+        return 2
+
+    watch = FolderWatch(args.folder, args.pdc, fields, args.output, log,
+                        None if args.no_cache else ReportCache(), args.interval, args.settle)
+    try:
+        watch.serve()
+    except KeyboardInterrupt:
+        log.reportError("stopped watching " + args.folder, "log")
+    finally:
+        watch.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
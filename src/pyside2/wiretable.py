@@ -0,0 +1,72 @@
+from array import array
+import math
+
+
+def toFloat(value):
+    """
+        value: cell value read from a report
+        returns value as a float, or NaN when it is not a number
+    """
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return math.nan
+
+
+class WireTable:
+    """
+        WireTable: columnar storage for the wires of one wire report
+        Connector and pin values are interned once into a shared string table,
+        so each wire is a row of integer ids plus its CSA and wire name.
+        Fields:
+            strings: interned connector and pin strings
+            ids: maps each string to its index in strings
+            from_conn, from_pin: string ids of the FROM (component, pin) of each wire
+            to_conn, to_pin: string ids of the TO (component, pin) of each wire
+            csa: CSA of each wire, NaN when the report value is not a number
+            wire: wire name of each wire
+        Methods:
+            intern(value): returns the string id of a cell value
+            append(from_conn, from_pin, to_conn, to_pin, csa, wire): adds a wire to the table
+    """
+
+    def __init__(self):
+        self.strings = []
+        self.ids = {}
+        self.from_conn = array('i')
+        self.from_pin = array('i')
+        self.to_conn = array('i')
+        self.to_pin = array('i')
+        self.csa = array('d')
+        self.wire = []
+
+    def __len__(self):
+        return len(self.wire)
+
+    def intern(self, value):
+        """
+            value: connector or pin cell value
+            returns the id of str(value) in strings, adding it if it is new
+        """
+        value = str(value)
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.ids[value] = string_id
+            self.strings.append(value)
+        return string_id
+
+    def append(self, from_conn, from_pin, to_conn, to_pin, csa, wire):
+        """
+            from_conn, from_pin: FROM component and pin cell values
+            to_conn, to_pin: TO component and pin cell values
+            csa: wire CSA cell value
+            wire: wire name cell value
+            adds a wire to the table
+        """
+        self.from_conn.append(self.intern(from_conn))
+        self.from_pin.append(self.intern(from_pin))
+        self.to_conn.append(self.intern(to_conn))
+        self.to_pin.append(self.intern(to_pin))
+        self.csa.append(toFloat(csa))
+        self.wire.append(wire)
@@ -0,0 +1,202 @@
+import os
+from openpyxl import load_workbook
+from xlsxreader import XlsxReader, XlsxFormatError
+
+# rows searched for the header before giving up on finding a complete one
+HEADER_PROBE_ROWS = 50
+
+
+def fileStat(filepath):
+    """
+        filepath: path of a file
+        returns (size, modification time in ns) of the file, which changes when it
+        is saved again, whether it is written in place or replaced
+    """
+    info = os.stat(filepath)
+    return info.st_size, info.st_mtime_ns
+
+
+class WorkbookSession:
+    """
+        WorkbookSession: one open wire report, shared by the column picker and the parser
+        The workbook is opened once, with XlsxReader, or with openpyxl when XlsxReader
+        can't read it. The header is found within the first probe_rows rows and the
+        wires are then read from the rows below it, without opening the file again.
+        loadRows() reads every row into memory ahead of time, after which the
+        session no longer holds the file and can be pickled to another process.
+        A closed session opens the workbook again when its rows are read, so it
+        can be closed while the columns are picked, and isCurrent() tells whether
+        the file was saved again since the session was opened.
+        Fields:
+            filepath: path of the report file
+            stat: fileStat of the report from when the session was opened
+            header: list of column names, empty if the report has no rows
+            header_row: row number of the header
+            columns: maps each column name to its 0-based column index
+            raw_rows: every non-empty row below the header, padded to the same
+                width, once loadRows() has run, otherwise None
+        Methods:
+            readHeader(): finds the header row, returns the column names
+            loadRows(): reads every row below the header into raw_rows
+            rows(columns): yields the mapped columns of each row below the header
+            useOpenpyxl(): reopens the workbook with openpyxl
+            isCurrent(): whether the file is unchanged since the session was opened
+            close(): closes the workbook file
+    """
+
+    def __init__(self, filepath, probe_rows=HEADER_PROBE_ROWS):
+        self.filepath = filepath
+        self.probe_rows = probe_rows
+        self.header = None
+        self.header_row = 1
+        self.columns = {}
+        self.raw_rows = None
+        self._reader = None
+        self._workb = None
+        self.stat = fileStat(filepath)
+        self._open()
+
+    def _open(self):
+        """
+            opens the workbook with XlsxReader, or with openpyxl when XlsxReader
+            can't read it
+        """
+        try:
+            self._reader = XlsxReader(self.filepath)
+        except XlsxFormatError:
+            self.useOpenpyxl()
+
+    def isCurrent(self):
+        """
+            returns True if the file still has the size and modification time it
+            had when the session was opened, False if it was saved again or is gone
+        """
+        try:
+            return fileStat(self.filepath) == self.stat
+        except OSError:
+            return False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getstate__(self):
+        # open files stay behind, a pickled session only carries what was read
+        state = self.__dict__.copy()
+        state['_reader'] = None
+        state['_workb'] = None
+        return state
+
+    def close(self):
+        """
+            closes the workbook file
+        """
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        if self._workb is not None:
+            self._workb.close()
+            self._workb = None
+
+    def useOpenpyxl(self):
+        """
+            closes the XlsxReader and opens the workbook with openpyxl instead,
+            for workbooks XlsxReader fails on part way through
+        """
+        self.close()
+        self._workb = load_workbook(self.filepath, read_only=True)
+
+    def _numberedRows(self):
+        if self._reader is None and self._workb is None:
+            self._open()
+        if self._reader is not None:
+            return self._reader.numberedRows()
+        sheet = self._workb.active
+        return enumerate(sheet.iter_rows(1, sheet.max_row, values_only=True), 1)
+
+    def readHeader(self):
+        """
+            Returns the column names of the report. Only the first probe_rows rows
+            are read: the header is the first of them with no empty cells, or
+            otherwise the first with at least half of the widest row filled, so a
+            blank header cell or a title row above the header doesn't make the
+            whole sheet get scanned
+        """
+        if self.header is not None:
+            return self.header
+        probe = []
+        rows = self._numberedRows()
+        try:
+            for number, row in rows:
+                if number > self.probe_rows:
+                    break
+                probe.append((number, row))
+                if None not in row:
+                    break
+        except XlsxFormatError:
+            self.useOpenpyxl()
+            return self.readHeader()
+        finally:
+            if hasattr(rows, 'close'):
+                rows.close()
+        filled = [len(row) - row.count(None) for _, row in probe]
+        self.header = []
+        if not filled or max(filled) == 0:
+            return self.header
+        for (number, row), count in zip(probe, filled):
+            if count * 2 >= max(filled):
+                self.header_row = number
+                self.header = ['' if x is None else x for x in row]
+                break
+        self.columns = {name: index for index, name in enumerate(self.header) if name != ''}
+        return self.header
+
+    def loadRows(self):
+        """
+            reads every row below the header into raw_rows, so rows() can
+            project columns without the workbook, then closes the workbook.
+            returns the number of rows read
+        """
+        self.readHeader()
+        if self._reader is None and self._workb is None:
+            self._open()
+        if self._reader is not None:
+            try:
+                rows = [x for x in self._reader.rows(None, self.header_row + 1)
+                        if x.count(None) != len(x)]
+            except XlsxFormatError:
+                self.useOpenpyxl()
+        if self._workb is not None:
+            sheet = self._workb.active
+            rows = [x for x in sheet.iter_rows(self.header_row + 1, sheet.max_row,
+                                               values_only=True)
+                    if x.count(None) != len(x)]
+        width = max([len(self.header)] + [len(x) for x in rows])
+        self.raw_rows = [x if len(x) == width else x + (None,) * (width - len(x))
+                         for x in rows]
+        self.close()
+        return len(self.raw_rows)
+
+    def rows(self, columns):
+        """
+            columns: 0-based column indexes to read, in the order to return them.
+                Negative indexes count from the last column
+            yields a tuple of the mapped values for each row below the header.
+            Raises IndexError for a column past the sheet width, and
+            XlsxFormatError if XlsxReader fails part way through the sheet
+        """
+        if self.raw_rows is not None:
+            for row in self.raw_rows:
+                yield tuple(row[x] for x in columns)
+            return
+        self.readHeader()
+        if self._reader is None and self._workb is None:
+            self._open()
+        if self._reader is not None:
+            yield from self._reader.rows(columns, self.header_row + 1)
+            return
+        sheet = self._workb.active
+        for row in sheet.iter_rows(self.header_row + 1, sheet.max_row, values_only=True):
+            yield tuple(row[x] for x in columns)
@@ -0,0 +1,288 @@
+import zipfile
+from xml.etree import ElementTree as ET
+from xml.parsers import expat
+
+NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PKG_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+
+class XlsxFormatError(ValueError):
+    """
+        raised when XlsxReader can't read a workbook, so the caller can fall back to openpyxl
+    """
+
+
+def columnIndex(ref):
+    """
+        ref: cell reference such as 'B12', or column letters such as 'B'
+        returns the 0-based column index of ref
+    """
+    index = 0
+    for char in ref:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - 64
+    return index - 1
+
+
+class XlsxReader:
+    """
+        XlsxReader: streaming reader for the active worksheet of an xlsx workbook
+        Reads the sheet XML and the shared strings table straight from the xlsx zip
+        with incremental expat parsing, skipping the cell objects and styles that openpyxl
+        builds. Only values are read: numbers come back as int or float, booleans
+        as bool, formulas as their '=' text, and everything else as str.
+        Dates stay as numbers.
+        Raises XlsxFormatError for workbooks it can't handle.
+        Fields:
+            filepath: path of the workbook
+        Methods:
+            rows(columns, min_row): yields the values of each row in the sheet
+            numberedRows(columns, min_row): yields each row with its row number
+            close(): closes the workbook file
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        try:
+            self._zip = zipfile.ZipFile(filepath)
+        except zipfile.BadZipFile as error:
+            raise XlsxFormatError(str(error)) from error
+        try:
+            self._sheet_path = self._activeSheetPath()
+            self._strings = self._readSharedStrings()
+        except (zipfile.BadZipFile, KeyError, ET.ParseError) as error:
+            self._zip.close()
+            raise XlsxFormatError(str(error)) from error
+        except BaseException:
+            self._zip.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+            closes the workbook file
+        """
+        self._zip.close()
+
+    def _activeSheetPath(self):
+        """
+            returns the zip path of the sheet openpyxl would open as workb.active
+        """
+        workbook = ET.fromstring(self._zip.read('xl/workbook.xml'))
+        sheets = workbook.findall(NS + 'sheets/' + NS + 'sheet')
+        view = workbook.find(NS + 'bookViews/' + NS + 'workbookView')
+        active = int(view.get('activeTab', 0)) if view is not None else 0
+        if not sheets or active >= len(sheets):
+            raise XlsxFormatError("no worksheet found in " + str(self.filepath))
+        rel_id = sheets[active].get(REL_NS + 'id')
+        rels = ET.fromstring(self._zip.read('xl/_rels/workbook.xml.rels'))
+        for rel in rels.iter(PKG_NS + 'Relationship'):
+            if rel.get('Id') == rel_id:
+                if not rel.get('Type', '').endswith('/worksheet'):
+                    raise XlsxFormatError("active sheet is not a worksheet")
+                target = rel.get('Target')
+                if target.startswith('/'):
+                    return target[1:]
+                return 'xl/' + target
+        raise XlsxFormatError("active sheet not found in " + str(self.filepath))
+
+    def _readSharedStrings(self):
+        """
+            returns the shared strings table as a list
+        """
+        strings = []
+        if 'xl/sharedStrings.xml' not in self._zip.namelist():
+            return strings
+        with self._zip.open('xl/sharedStrings.xml') as stream:
+            for _, elem in ET.iterparse(stream):
+                if elem.tag != NS + 'si':
+                    continue
+                text = elem.find(NS + 't')
+                if text is not None:
+                    strings.append(text.text or '')
+                else:
+                    # rich text, join the runs and skip phonetic hints
+                    strings.append(''.join(run.findtext(NS + 't') or ''
+                                           for run in elem.findall(NS + 'r')))
+                elem.clear()
+        return strings
+
+    def rows(self, columns=None, min_row=1):
+        """
+            columns: 0-based column indexes to read, in the order to return them,
+                or None for every column. Negative indexes count from the last
+                column, as with openpyxl row tuples
+            min_row: first row number to read
+            Yields a tuple of values for each row in the sheet from min_row on,
+            with None for empty cells. Rows missing from the sheet XML are empty
+            and are skipped. Raises IndexError for a column past the sheet width
+        """
+        for _, values in self.numberedRows(columns, min_row):
+            yield values
+
+    def numberedRows(self, columns=None, min_row=1):
+        """
+            columns, min_row: as for rows()
+            yields (row number, values) for each row rows() yields
+        """
+        handler = _SheetHandler(self._strings, columns, min_row)
+        parser = expat.ParserCreate(namespace_separator='}')
+        parser.buffer_text = True
+        parser.StartElementHandler = handler.start
+        parser.EndElementHandler = handler.end
+        parser.CharacterDataHandler = handler.data
+        try:
+            with self._zip.open(self._sheet_path) as stream:
+                while True:
+                    chunk = stream.read(2 ** 16)
+                    parser.Parse(chunk, not chunk)
+                    # hand over the rows finished in this chunk, so
+                    # memory stays flat however long the sheet is
+                    rows, handler.rows = handler.rows, []
+                    yield from rows
+                    if not chunk:
+                        break
+        except (zipfile.BadZipFile, expat.ExpatError, KeyError, ValueError) as error:
+            raise XlsxFormatError(str(error)) from error
+
+
+class _SheetHandler:
+    """
+        expat callbacks that turn the cells of a sheet XML into row tuples
+    """
+    ROW = NS[1:] + 'row'
+    CELL = NS[1:] + 'c'
+    VALUE = NS[1:] + 'v'
+    FORMULA = NS[1:] + 'f'
+    TEXT = NS[1:] + 't'
+    DIMENSION = NS[1:] + 'dimension'
+    SHEET_DATA = NS[1:] + 'sheetData'
+
+    def __init__(self, strings, columns, min_row):
+        self.strings = strings
+        self.columns = columns
+        self.min_row = min_row
+        self.width = None
+        self.wanted = None
+        self.rows = []
+        self.row_number = 0
+        self.values = None
+        self.column = -1
+        self.keep = False
+        self.kind = 'n'
+        self.parts = None
+        self.text = None
+        self.formula = None
+
+    def start(self, name, attrs):
+        """
+            expat StartElementHandler
+        """
+        if name == self.CELL:
+            ref = attrs.get('r')
+            self.column = columnIndex(ref) if ref else self.column + 1
+            self.keep = self.wanted is None or self.column in self.wanted
+            self.kind = attrs.get('t', 'n')
+            self.text = None
+            self.formula = None
+        elif name in (self.VALUE, self.TEXT, self.FORMULA):
+            if self.keep:
+                self.parts = []
+        elif name == self.ROW:
+            self.row_number = int(attrs.get('r', self.row_number + 1))
+            self.column = -1
+            if self.wanted is None:
+                self.values = [None] * (self.width or 0)
+            else:
+                self.values = [None] * len(self.columns)
+        elif name == self.DIMENSION:
+            self.width = columnIndex(attrs.get('ref', 'A1').split(':')[-1]) + 1
+        elif name == self.SHEET_DATA:
+            self.wanted = self._wantedColumns()
+
+    def data(self, text):
+        """
+            expat CharacterDataHandler
+        """
+        if self.parts is not None:
+            self.parts.append(text)
+
+    def end(self, name):
+        """
+            expat EndElementHandler
+        """
+        if name == self.CELL:
+            if self.keep:
+                self._store(self._value())
+        elif name == self.VALUE or name == self.TEXT:
+            if self.parts is not None:
+                # inline strings may be split into several text runs
+                self.text = (self.text or '') + ''.join(self.parts)
+                self.parts = None
+        elif name == self.FORMULA:
+            if self.parts is not None:
+                self.formula = ''.join(self.parts)
+                self.parts = None
+        elif name == self.ROW:
+            if self.row_number >= self.min_row:
+                self.rows.append((self.row_number, tuple(self.values)))
+
+    def _value(self):
+        """
+            returns the typed value of the cell that just ended
+        """
+        if self.formula:
+            # openpyxl hands back the formula rather than its cached result
+            return '=' + self.formula
+        text = self.text
+        if self.kind == 'inlineStr':
+            return text or ''
+        if not text:
+            return None
+        if self.kind == 'n':
+            if '.' in text or 'E' in text or 'e' in text:
+                return float(text)
+            return int(text)
+        if self.kind == 's':
+            return self.strings[int(text)]
+        if self.kind == 'b':
+            return text == '1'
+        return text
+
+    def _store(self, value):
+        """
+            puts the value of the cell that just ended into the row
+        """
+        if self.wanted is None:
+            if self.column >= len(self.values):
+                self.values.extend([None] * (self.column + 1 - len(self.values)))
+            self.values[self.column] = value
+        else:
+            for position in self.wanted[self.column]:
+                self.values[position] = value
+
+    def _wantedColumns(self):
+        """
+            returns a dict mapping each wanted column index to its
+            position in the row tuple, or None for every column
+        """
+        if self.columns is None:
+            return None
+        width = self.width
+        wanted = {}
+        for position, column in enumerate(self.columns):
+            if column < 0 or (width is not None and column >= width):
+                if width is None:
+                    raise XlsxFormatError("sheet has no dimension for column " + str(column))
+                if column < -width or column >= width:
+                    raise IndexError(column)
+                column += width if column < 0 else 0
+            wanted.setdefault(column, []).append(position)
+        return wanted